@@ -0,0 +1,113 @@
+# Arrival schedules: every vehicle of a run drawn in advance
+# The arrival times of each approach and the class, lane and turn of every vehicle are
+# sampled with NumPy in a few array operations before the run starts, and the tick loop
+# only takes the arrivals that are due. Arrivals follow a regular interval, a Poisson
+# process, or a Poisson process whose rate follows the hourly traffic density of
+# ml model/traffic_dataset.csv.
+import csv
+import os
+import numpy as np
+
+# Share of the traffic on each approach: right, down, left, up
+directionShares = np.array([0.4, 0.4, 0.1, 0.1])
+turnShare = 0.6     # vehicles in lane 2 that turn
+datasetPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml model', 'traffic_dataset.csv')
+demands = ['regular', 'poisson', 'hourly']
+# Per-arrival arrays of a schedule and their types
+fields = {'times': float, 'direction': int, 'lane': int, 'vehicleClass': int, 'willTurn': bool}
+
+class ArrivalSchedule:
+    # Arrays of the same length sorted by time, direction and vehicleClass use the
+    # numbers of directionNumbers and vehicleTypes in simulation.py
+    def __init__(self, times, direction, lane, vehicleClass, willTurn):
+        self.times = times
+        self.direction = direction
+        self.lane = lane
+        self.vehicleClass = vehicleClass
+        self.willTurn = willTurn
+        self.next = 0       # first arrival not handed out yet
+
+    def __len__(self):
+        return len(self.times)
+
+    # Indices of the arrivals up to simulated time now that were not handed out yet
+    def due(self, now):
+        end = int(np.searchsorted(self.times, now + 1e-9, side='right'))
+        start = self.next
+        self.next = max(end, start)
+        return range(start, self.next)
+
+    def snapshot(self):
+        state = {name: getattr(self, name).copy() for name in fields}
+        state['next'] = self.next
+        return state
+
+# Schedule saved by ArrivalSchedule.snapshot(). The arrays are copied into new ones, so a
+# restored schedule pickles to the same bytes as the original.
+def restoreSchedule(state):
+    arrays = []
+    for name, dtype in fields.items():
+        array = np.empty(len(state[name]), dtype=dtype)
+        array[:] = state[name]
+        arrays.append(array)
+    schedule = ArrivalSchedule(*arrays)
+    schedule.next = state['next']
+    return schedule
+
+# Relative traffic of every hour of the day, 1 being the daily mean: the share of
+# observations of that hour with dense traffic
+def hourlyFactors(path=datasetPath):
+    hours = np.zeros(24)
+    dense = np.zeros(24)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            hour = int(row['TimeOfDay'])
+            hours[hour] += 1
+            dense[hour] += int(row['TrafficDensity'])
+    share = dense/np.maximum(hours, 1)
+    return share/share.mean()
+
+# Sorted times of a Poisson process of rate per second over [0, duration)
+def poissonTimes(rng, duration, rate):
+    return np.sort(rng.uniform(0, duration, rng.poisson(rate*duration)))
+
+# Poisson process whose rate changes over time, by thinning one at the peak rate.
+# rates holds the rate of every period of periodLength seconds and wraps around.
+def varyingTimes(rng, duration, rates, periodLength):
+    peak = rates.max()
+    times = poissonTimes(rng, duration, peak)
+    rate = rates[(times//periodLength).astype(int) % len(rates)]
+    return times[rng.uniform(0, peak, len(times)) < rate]
+
+# Schedule of duration simulated seconds with a vehicle every interval seconds on average.
+# regular keeps the interval exactly and picks the approach by directionShares, poisson
+# and hourly give every approach its own arrivals at its share of the rate. hourly
+# scales the rate by hourlyFactors(), starting at startHour with hourLength simulated
+# seconds per hour of the day.
+def buildSchedule(duration, interval, demand='regular', seed=None, startHour=8, hourLength=60):
+    rng = np.random.default_rng(seed)
+    if(demand=='regular'):
+        times = np.arange(int(np.ceil(duration/interval)))*interval
+        direction = rng.choice(4, len(times), p=directionShares)
+    else:
+        if(demand=='hourly'):
+            factors = np.roll(hourlyFactors(), -startHour)
+        perApproach = []
+        for number, share in enumerate(directionShares):
+            rate = share/interval
+            if(demand=='hourly'):
+                perApproach.append(varyingTimes(rng, duration, rate*factors, hourLength))
+            elif(demand=='poisson'):
+                perApproach.append(poissonTimes(rng, duration, rate))
+            else:
+                raise ValueError('unknown demand: ' + demand)
+        times = np.concatenate(perApproach)
+        direction = np.concatenate([np.full(len(t), number) for number, t in enumerate(perApproach)])
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        direction = direction[order]
+    count = len(times)
+    vehicleClass = rng.integers(0, 5, count)
+    lane = np.where(vehicleClass==4, 0, rng.integers(1, 3, count))     # bikes keep to lane 0
+    willTurn = (lane==2) & (rng.uniform(0, 1, count) < turnShare)
+    return ArrivalSchedule(times, direction, lane, vehicleClass, willTurn)
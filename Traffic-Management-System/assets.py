@@ -0,0 +1,49 @@
+# Process-wide cache of the vehicle sprites
+# Every images/<direction>/<class>.png is loaded from disk once; vehicles share the
+# returned surface and must treat it as read-only (rotation makes a new surface).
+import pygame
+
+vehicleImages = {}
+rotatedImages = {}  # (vehicle class, direction, angle) -> turned sprite
+hits = 0
+misses = 0
+
+def vehicleImage(direction, vehicleClass):
+    global hits, misses
+    image = vehicleImages.get((direction, vehicleClass))
+    if image is None:
+        misses += 1
+        image = pygame.image.load("images/" + direction + "/" + vehicleClass + ".png")
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()   # display pixel format, blits without conversion
+        vehicleImages[(direction, vehicleClass)] = image
+    else:
+        hits += 1
+    return image
+
+# Sprite of a vehicle turned clockwise by angle degrees, rotated once and then looked up
+def rotatedImage(direction, vehicleClass, angle):
+    image = rotatedImages.get((vehicleClass, direction, angle))
+    if image is None:
+        image = pygame.transform.rotate(vehicleImage(direction, vehicleClass), -angle)
+        rotatedImages[(vehicleClass, direction, angle)] = image
+    return image
+
+# Convert the images loaded before the display existed, call after pygame.display.set_mode()
+def convertImages():
+    for key in vehicleImages:
+        vehicleImages[key] = vehicleImages[key].convert_alpha()
+    rotatedImages.clear()
+
+# Load every vehicle image, and every turn frame when rotationAngle is given,
+# up front so spawning and turning never touch the disk or rotate a surface
+def preload(directions, vehicleClasses, rotationAngle=None):
+    for direction in directions:
+        for vehicleClass in vehicleClasses:
+            vehicleImage(direction, vehicleClass)
+            if rotationAngle:
+                for angle in range(rotationAngle, 91, rotationAngle):
+                    rotatedImage(direction, vehicleClass, angle)
+
+def cacheStats():
+    return {'hits': hits, 'misses': misses, 'images': len(vehicleImages), 'rotations': len(rotatedImages)}
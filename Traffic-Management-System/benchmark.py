@@ -0,0 +1,140 @@
+# Benchmark of the simulation core at fixed vehicle populations
+# Every population runs in a worker process on a simulated clock: the lanes are filled
+# with that many vehicles, the tick loop (signals, movement, retiring, and respawning to
+# hold the population) is timed, then the renderer with SDL's dummy video driver.
+# Each result is compared against a baseline recorded on the same machine and a
+# slowdown beyond the tolerance makes the run fail. Timings of another machine say
+# nothing, so the baseline is not part of the repository.
+#   python benchmark.py --save-baseline   record the baseline of this machine
+#   python benchmark.py                   compare against it
+import argparse
+import json
+import os
+import sys
+import time
+from worker_pool import mapTasks
+try:
+    import resource
+except ImportError:     # not available on Windows, peak memory is then not reported
+    resource = None
+
+populations = [100, 1000, 10000]
+# Reported metrics, True where a higher value is better
+higherIsBetter = {'ticksPerSecond': True, 'usPerVehicleUpdate': False, 'renderMsPerFrame': False, 'peakRssMb': False}
+
+def runPopulation(task):
+    population, ticks, frames, seed = task
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    import simulation
+    from assets import convertImages, preload
+    from renderer import Renderer
+    from signal_scheduler import SimulatedClock
+
+    # a display first, so the sprites are converted as in the live window
+    screen = pygame.display.set_mode((simulation.screenWidth, simulation.screenHeight))
+    convertImages()
+    preload(simulation.directionNumbers.values(), simulation.vehicleTypes.values(), simulation.rotationAngle)
+    simulation.configure(strategyName='lanes')
+    simulation.resetRun()
+    clock = SimulatedClock()
+    simulation.initialize(clock)
+    # vehicles come off arrival schedules as in a run, in order but as soon as there is room
+    simulation.scheduleArrivals(population*simulation.spawnInterval, seed)
+    schedule = [seed, 0]    # seed and next arrival of the current schedule
+    def spawn():
+        if(schedule[1]==len(simulation.arrivals)):
+            schedule[0] += 1
+            schedule[1] = 0
+            simulation.scheduleArrivals(population*simulation.spawnInterval, schedule[0])
+        simulation.spawnArrival(schedule[1])
+        schedule[1] += 1
+    for i in range(population):
+        spawn()
+
+    tick = [0]
+    def step():
+        clock.now = tick[0]/float(simulation.ticksPerSecond)
+        simulation.scheduler.runUntil(clock.now)
+        simulation.moveVehicles()
+        while(len(simulation.simulation)<population):
+            spawn()
+        tick[0] += 1
+
+    start = time.perf_counter()
+    for i in range(ticks):
+        step()
+    tickTime = time.perf_counter() - start
+
+    renderer = Renderer(screen, pygame.image.load(simulation.background).convert())
+    renderTime = 0
+    for i in range(frames):
+        step()
+        start = time.perf_counter()
+        renderer.clearVehicles()
+        renderer.drawVehicles(simulation.frameState().vehicles)
+        renderer.update()
+        renderTime += time.perf_counter() - start
+
+    return population, {
+        'ticksPerSecond': ticks/tickTime,
+        'usPerVehicleUpdate': tickTime/(ticks*population)*1e6,
+        'renderMsPerFrame': renderTime/frames*1e3 if frames else None,
+        'peakRssMb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0 if resource else None,  # kilobytes on Linux
+    }
+
+def runBenchmarks(sizes, ticks, frames, seed=0):
+    # one population at a time so the timings do not compete for the cores, smallest
+    # first as the peak memory of the worker is that of the largest population so far
+    return dict(mapTasks(runPopulation, [(size, ticks, frames, seed) for size in sorted(sizes)], 1))
+
+# Rows of (population, metric, value, baseline, ratio, regressed)
+def compare(results, baseline, tolerance):
+    rows = []
+    for population, result in sorted(results.items()):
+        base = baseline.get(str(population), {})
+        for metric, higher in higherIsBetter.items():
+            value = result[metric]
+            reference = base.get(metric)
+            if value is None or not reference:
+                rows.append((population, metric, value, reference, None, False))
+                continue
+            ratio = value/reference
+            regressed = ratio<1-tolerance if higher else ratio>1+tolerance
+            rows.append((population, metric, value, reference, ratio, regressed))
+    return rows
+
+def printRows(rows):
+    print('%-11s %-20s %12s %12s %8s' % ('Population', 'Metric', 'Value', 'Baseline', 'Ratio'))
+    for population, metric, value, reference, ratio, regressed in rows:
+        print('%-11d %-20s %12s %12s %8s %s' % (population, metric,
+              '-' if value is None else '%.2f' % value,
+              '-' if reference is None else '%.2f' % reference,
+              '-' if ratio is None else '%.2f' % ratio,
+              'REGRESSION' if regressed else ''))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tick and render benchmark of the simulation core')
+    parser.add_argument('--populations', type=int, nargs='+', default=populations, help='vehicles on the junction')
+    parser.add_argument('--ticks', type=int, default=600, help='timed ticks per population')
+    parser.add_argument('--frames', type=int, default=120, help='timed rendered frames per population')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='results of this machine to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown, 0.2 is 20%%')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args()
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        sys.exit('No baseline at %s, record one on this machine with --save-baseline' % args.baseline)
+
+    results = runBenchmarks(args.populations, args.ticks, args.frames)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({str(population): result for population, result in sorted(results.items())}, f, indent=2)
+        printRows(compare(results, {}, args.tolerance))
+        sys.exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.tolerance)
+    printRows(rows)
+    if any(row[5] for row in rows):
+        sys.exit(1)
@@ -0,0 +1,103 @@
+# Calibration of the constants of the green-time formula in simulation.py
+# Candidate settings of the per-class crossing times, the detection time and the green
+# time clamps are drawn at random from searchSpace. Each one runs on the same seeded
+# headless repetitions across a process pool, and the settings not beaten on both
+# throughput and average wait by any other (the Pareto front) are reported.
+#   python calibrate.py --candidates 50 --runs 5 --duration 300
+import argparse
+import csv
+import random
+import statistics
+from worker_pool import mapTasks
+
+# Parameter -> (lowest, highest), integers are drawn as integers
+searchSpace = {
+    'carTime': (0.5, 4.0),
+    'bikeTime': (0.25, 2.0),
+    'rickshawTime': (0.5, 4.0),
+    'busTime': (1.0, 5.0),
+    'truckTime': (1.0, 5.0),
+    'detectionTime': (2, 10),
+    'defaultMinimum': (5, 20),
+    'defaultMaximum': (20, 90),
+}
+
+def currentSettings(profile):
+    import simulation
+    simulation.configure(profile)
+    return {name: getattr(simulation, name) for name in searchSpace}
+
+def drawSettings(rng):
+    settings = {}
+    for name, (low, high) in searchSpace.items():
+        if isinstance(low, int):
+            settings[name] = rng.randint(low, high)
+        else:
+            settings[name] = round(rng.uniform(low, high), 2)
+    if(settings['defaultMaximum']<settings['defaultMinimum']):
+        settings['defaultMaximum'] = settings['defaultMinimum']
+    return settings
+
+def runOnce(task):
+    candidate, settings, seed, duration, profile = task
+    import simulation
+    simulation.configure(profile, 'lanes')
+    for name, value in settings.items():
+        setattr(simulation, name, value)
+    simulation.runHeadless(duration, seed)
+    crossed = sum(simulation.vehicles[direction]['crossed'] for direction in simulation.vehicles)
+    return candidate, crossed/float(simulation.timeElapsed), simulation.averageWait()
+
+# Settings with no other candidate at least as good on both measures and better on one
+def paretoFront(rows):
+    front = []
+    for row in rows:
+        dominated = any(other['throughput']>=row['throughput'] and other['wait']<=row['wait'] and
+                        (other['throughput']>row['throughput'] or other['wait']<row['wait']) for other in rows)
+        if not dominated:
+            front.append(row)
+    return sorted(front, key=lambda row: -row['throughput'])
+
+def calibrate(candidates, runs, duration, firstSeed=0, processes=None, profile='first'):
+    rng = random.Random(firstSeed)
+    settings = [currentSettings(profile)] + [drawSettings(rng) for i in range(candidates)]
+    # every candidate sees the same seeds, so they are compared on the same traffic
+    tasks = [(candidate, settings[candidate], firstSeed+i, duration, profile)
+             for candidate in range(len(settings)) for i in range(runs)]
+    results = mapTasks(runOnce, tasks, processes)
+    rows = []
+    for candidate in range(len(settings)):
+        throughput = [result[1] for result in results if result[0]==candidate]
+        wait = [result[2] for result in results if result[0]==candidate]
+        rows.append({'candidate': candidate, 'settings': settings[candidate],
+                     'throughput': statistics.mean(throughput), 'wait': statistics.mean(wait)})
+    return rows, paretoFront(rows)
+
+def writeResults(path, rows, front):
+    best = set(row['candidate'] for row in front)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Candidate'] + list(searchSpace) + ['Per second', 'Average wait', 'Pareto'])
+        for row in rows:
+            writer.writerow([row['candidate']] + [row['settings'][name] for name in searchSpace] +
+                            [round(row['throughput'], 4), round(row['wait'], 2), int(row['candidate'] in best)])
+
+if __name__ == '__main__':
+    from simulation import profiles
+    parser = argparse.ArgumentParser(description='Search the green-time formula constants for throughput and waiting time')
+    parser.add_argument('--candidates', type=int, default=50, help='random settings tried besides the current ones')
+    parser.add_argument('--runs', type=int, default=5, help='seeded repetitions per candidate')
+    parser.add_argument('--duration', type=int, default=300, help='simulated seconds per run')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the search and of the first run')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--profile', default='first', choices=sorted(profiles), help='intersection geometry')
+    parser.add_argument('--out', default='Charts/calibration.csv', help='every candidate with its results')
+    args = parser.parse_args()
+
+    rows, front = calibrate(args.candidates, args.runs, args.duration, args.seed, args.processes, args.profile)
+    writeResults(args.out, rows, front)
+    print('Current settings: per second', round(rows[0]['throughput'], 3), 'average wait', round(rows[0]['wait'], 2))
+    print('Pareto front:')
+    for row in front:
+        print(' candidate', row['candidate'], ': per second', round(row['throughput'], 3),
+              'average wait', round(row['wait'], 2), row['settings'])
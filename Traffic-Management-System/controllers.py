@@ -0,0 +1,77 @@
+# Signal controllers
+# A controller is asked which signal turns green next and for how long, detectionTime
+# seconds before the current one goes red, and whether to extend the current green
+# when it runs out. Both decisions get an Observation of the junction, so the same
+# controllers run on any junction that can describe its queues.
+import collections
+
+# signal: the signal next in the cycle, current: the signal green now,
+# queues: vehicles waiting before the stop line per direction and lane,
+# counts: the same per direction and vehicle class, elapsed: seconds the current
+# signal has been green, now: simulated time
+Observation = collections.namedtuple('Observation', ['signal', 'current', 'queues', 'counts', 'elapsed', 'now'])
+
+class Controller:
+    # (signal to turn green next, its green time or None to keep the default)
+    def decide(self, observation):
+        return observation.signal, None
+
+    # Seconds to add to the current green as it runs out, 0 to let it turn yellow
+    def extend(self, observation):
+        return 0
+
+# The same green time for every signal in turn
+class FixedTime(Controller):
+    def __init__(self, green):
+        self.green = green
+
+    def decide(self, observation):
+        return observation.signal, self.green
+
+# Signals in turn, each green for the time greenTime(counts) gives its waiting vehicles
+class Formula(Controller):
+    def __init__(self, greenTime):
+        self.greenTime = greenTime
+
+    def decide(self, observation):
+        return observation.signal, self.greenTime(observation.counts[observation.signal])
+
+# Signals in turn, each green for minimum seconds and extended by extension seconds at a
+# time while vehicles are still waiting on it, up to maximum
+class Actuated(Controller):
+    def __init__(self, minimum, maximum, extension=3):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.extension = extension
+
+    def decide(self, observation):
+        return observation.signal, self.minimum
+
+    def extend(self, observation):
+        if sum(observation.queues[observation.current])==0:
+            return 0
+        return max(0, min(self.extension, self.maximum - observation.elapsed))
+
+# Green for a slot of fixed length to the signal with the highest pressure, the vehicles
+# waiting on it less the ones waiting downstream. An isolated junction has nothing
+# downstream, so the pressure is the queue. The current signal is never picked twice
+# in a row, it has just been served.
+class MaxPressure(Controller):
+    def __init__(self, slot, downstream=None):
+        self.slot = slot
+        self.downstream = downstream    # downstream(signal) -> vehicles waiting past it, 0 by default
+
+    def decide(self, observation):
+        best = observation.signal
+        bestPressure = None
+        for i in range(len(observation.queues)):
+            signal = (observation.signal + i)%len(observation.queues)    # ties go to the next in turn
+            if signal==observation.current:
+                continue
+            pressure = sum(observation.queues[signal])
+            if self.downstream:
+                pressure -= self.downstream(signal)
+            if bestPressure is None or pressure>bestPressure:
+                best = signal
+                bestPressure = pressure
+        return best, self.slot
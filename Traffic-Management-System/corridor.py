@@ -0,0 +1,196 @@
+# Arterial corridor of signalised junctions joined by road links
+# Every junction is the four-way intersection of simulation.py with its own lane queues
+# and signal scheduler, all on one simulated clock. The vehicles of all junctions share
+# one vehicle store, one group per junction, and move in one step per tick. A vehicle that leaves a
+# junction to the east or west drives along the link and joins the approach queue of the
+# next junction, so platoons released by one signal arrive at the next. The arterial
+# phases of neighbouring junctions are offset by the travel time between their stop
+# lines to form a green wave for eastbound traffic.
+#   python corridor.py --junctions 20 --duration 300
+import argparse
+import heapq
+import random
+import time
+import numpy as np
+from simulation import (TrafficSignal, x, y, stopLines, defaultStop, mid, gap, gap2, rotationAngle, speeds,
+                        vehicleTypes, directionNumbers, screenWidth, screenHeight, detectionTime,
+                        defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum, ticksPerSecond)
+from assets import vehicleImage, rotatedImage
+from vehicle_store import VehicleStore, StoredVehicle
+from lane_queue import LaneQueue
+from signal_scheduler import SignalScheduler, SimulatedClock
+
+# Green time of each signal: the arterial (right and left) gets the longer phases
+arterialGreen = 25
+sideGreen = 10
+linkLength = 300        # pixels of road between the edge of one junction and the start of the next
+arterialInterval = 1.0  # seconds between vehicles entering at each end of the corridor
+sideInterval = 4.0      # seconds between vehicles entering from each side street
+
+class CorridorVehicle(StoredVehicle):
+    def __init__(self, store, junction, direction_number, lane, vehicleClass, willTurn, entered, origin):
+        self.store = store
+        self.junction = junction
+        self.direction_number = direction_number
+        self.direction = directionNumbers[direction_number]
+        self.lane = lane
+        self.vehicleClass = vehicleClass
+        self.willTurn = willTurn
+        self.entered = entered      # time the vehicle entered the corridor
+        self.origin = origin        # junction it entered the arterial at from one of its ends, None from a side street
+        width, height = vehicleImage(self.direction, vehicleClass).get_size()
+        junction.lanes[direction_number][lane].spawn(self, store, width, height, speeds[vehicleClass], willTurn, junction.index)
+
+class Junction:
+    # greens holds the green time of each signal, the first green starts offset seconds into the cycle
+    def __init__(self, index, store, clock, greens, offset, cycle):
+        self.index = index
+        self.store = store
+        self.greens = greens
+        self.signals = [TrafficSignal(defaultRed, defaultYellow, greens[i], defaultMinimum, defaultMaximum)
+                        for i in range(0,4)]
+        self.lanes = {number: [LaneQueue(number, lane, x[direction][lane], y[direction][lane], defaultStop[direction], gap)
+                               for lane in range(0,3)]
+                      for number, direction in directionNumbers.items()}
+        self.crossed = [0, 0, 0, 0]
+        self.scheduler = SignalScheduler(self.signals, clock, detectionTime, defaultRed, defaultYellow, defaultGreen,
+                                         onDetect=self.detect, onYellow=self.startYellow)
+        # begin one cycle early, the events before time 0 are replayed on the first tick
+        self.scheduler.beginGreen(0, offset - cycle)
+
+    # Fixed-time plan, every cycle has the same length so the offsets hold
+    def detect(self, signalNumber):
+        self.signals[signalNumber].green = self.greens[signalNumber]
+
+    def startYellow(self, signalNumber):
+        self.store.resetStops(signalNumber, defaultStop[directionNumbers[signalNumber]], self.index)
+
+# Offset of each junction so that a vehicle released at the start of the eastbound green
+# reaches the next stop line as that green starts: stop line to stop line is one
+# junction width plus a link
+def greenWaveOffsets(junctions, cycle, progressionSpeed):
+    travel = (screenWidth + linkLength)/float(progressionSpeed)
+    return [(i*travel)%cycle for i in range(junctions)]
+
+class Corridor:
+    def __init__(self, junctions, seed=None, greenWave=True):
+        self.clock = SimulatedClock()
+        self.random = random.Random(seed)
+        greens = [arterialGreen, sideGreen, arterialGreen, sideGreen]
+        self.cycle = sum(greens) + 4*defaultYellow
+        progressionSpeed = speeds['car']*ticksPerSecond     # pixels per second of a free-flowing car
+        if greenWave:
+            offsets = greenWaveOffsets(junctions, self.cycle, progressionSpeed)
+        else:
+            offsets = [0]*junctions
+        self.store = VehicleStore([stopLines[directionNumbers[i]] for i in range(0,4)],
+                                  [mid['right']['x'], mid['down']['y'], mid['left']['x'], mid['up']['y']],
+                                  gap2, rotationAngle, 256*junctions)
+        self.junctions = [Junction(i, self.store, self.clock, greens, offsets[i], self.cycle) for i in range(junctions)]
+        self.currentGreen = np.zeros(junctions, dtype=int)  # phase of every junction, indexed by group
+        self.currentYellow = np.zeros(junctions, dtype=int)
+        self.links = []     # vehicles on a link: (arrival time, order, junction, direction, lane, class, entered, origin)
+        self.order = 0
+        self.entered = 0
+        self.exited = 0
+        self.trips = {1: [], -1: []}    # corridor travel times of vehicles that drove its whole length, per heading
+
+    # Class, lane and turn of a new vehicle, with the shares of arrivals.py
+    def draw(self):
+        vehicleClass = vehicleTypes[self.random.randint(0,4)]
+        lane = 0 if vehicleClass=='bike' else self.random.randint(0,1) + 1
+        return vehicleClass, lane, self.turn(lane)
+
+    def turn(self, lane):
+        return 1 if lane==2 and self.random.randint(0,4)<=2 else 0
+
+    def enter(self, junction, direction_number, now):
+        vehicleClass, lane, willTurn = self.draw()
+        origin = junction if direction_number in (0, 2) else None
+        CorridorVehicle(self.store, self.junctions[junction], direction_number, lane, vehicleClass, willTurn, now, origin)
+        self.entered += 1
+
+    # Move the vehicles of every junction by one frame and route the ones that left a junction
+    def step(self, now):
+        store = self.store
+        for junction in self.junctions:
+            self.currentGreen[junction.index], self.currentYellow[junction.index] = junction.scheduler.phase
+        crossed, rotated = store.move(self.currentGreen, self.currentYellow)
+        for slot in crossed:
+            vehicle = store.owners[slot]
+            vehicle.junction.crossed[vehicle.direction_number] += 1
+            vehicle.junction.lanes[vehicle.direction_number][vehicle.lane].markCrossed(vehicle)
+        for slot in rotated:
+            vehicle = store.owners[slot]
+            width, height = rotatedImage(vehicle.direction, vehicle.vehicleClass, int(store.angle[slot])).get_size()
+            store.width[slot] = width
+            store.height[slot] = height
+        for vehicle in store.retire(screenWidth, screenHeight):
+            vehicle.junction.lanes[vehicle.direction_number][vehicle.lane].remove(vehicle)
+            if(vehicle.x > screenWidth):
+                self.route(vehicle, 1, now)
+            elif(vehicle.x + vehicle.width < 0):
+                self.route(vehicle, -1, now)
+            else:
+                self.route(vehicle, 0, now)
+
+    # Send a vehicle that left its junction on side (1 east, -1 west, 0 north or south)
+    # along the link to the next junction, or out of the corridor
+    def route(self, vehicle, side, now):
+        target = vehicle.junction.index + side
+        if side==0 or target<0 or target>=len(self.junctions):
+            self.exited += 1
+            if side!=0 and vehicle.origin==(0 if side==1 else len(self.junctions)-1):
+                self.trips[side].append(now - vehicle.entered)
+            return
+        arrival = now + linkLength/(speeds[vehicle.vehicleClass]*ticksPerSecond)
+        direction_number = 0 if side==1 else 2
+        heapq.heappush(self.links, (arrival, self.order, target, direction_number, vehicle.lane,
+                                    vehicle.vehicleClass, vehicle.entered, vehicle.origin))
+        self.order += 1
+
+    def run(self, duration):
+        arterialTicks = int(arterialInterval*ticksPerSecond)
+        sideTicks = int(sideInterval*ticksPerSecond)
+        last = len(self.junctions) - 1
+        for tick in range(int(duration*ticksPerSecond)):
+            now = tick/float(ticksPerSecond)
+            self.clock.now = now
+            if(tick%arterialTicks==0):
+                self.enter(0, 0, now)
+                self.enter(last, 2, now)
+            if(tick%sideTicks==0):
+                for junction in range(len(self.junctions)):
+                    self.enter(junction, 1, now)
+                    self.enter(junction, 3, now)
+            while self.links and self.links[0][0]<=now:
+                arrival, order, target, direction_number, lane, vehicleClass, entered, origin = heapq.heappop(self.links)
+                CorridorVehicle(self.store, self.junctions[target], direction_number, lane, vehicleClass,
+                                self.turn(lane), entered, origin)
+            for junction in self.junctions:
+                junction.scheduler.runUntil(now)
+            self.step(now)
+
+def printSummary(corridor, duration, wallTime):
+    print('Junctions: ', len(corridor.junctions), ' cycle: ', corridor.cycle, 's')
+    print('Simulated', duration, 's in', round(wallTime, 2), 's, ', round(duration/wallTime, 2), 'x real time')
+    print('Vehicles entered: ', corridor.entered, ' left: ', corridor.exited, ' on links: ', len(corridor.links))
+    for side, heading in ((1, 'Eastbound'), (-1, 'Westbound')):
+        trips = corridor.trips[side]
+        if trips:
+            print(heading, 'through trips: ', len(trips), ' mean time: ', round(sum(trips)/len(trips), 1), 's')
+        else:
+            print(heading, 'through trips: 0')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless corridor of coordinated junctions')
+    parser.add_argument('--junctions', type=int, default=20, help='junctions along the arterial')
+    parser.add_argument('--duration', type=int, default=300, help='simulated seconds')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the vehicle generator')
+    parser.add_argument('--no-green-wave', action='store_true', help='start every junction at the same time')
+    args = parser.parse_args()
+
+    corridor = Corridor(args.junctions, args.seed, not args.no_green_wave)
+    start = time.perf_counter()
+    corridor.run(args.duration)
+    printSummary(corridor, args.duration, time.perf_counter() - start)
@@ -0,0 +1,55 @@
+# Detection service: a fixed pool of worker threads for camera reads and YOLO
+# Requests are bounded: at most maxPending wait or run at once, further ones are refused
+# straight away so a slow model cannot pile up work. Every accepted request returns a
+# future. The latest result of each key is kept, including ones that arrived too late
+# to be used, as the fallback for requests that miss their deadline.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class DetectionService:
+    # detect(key) returns the result for key or None when there is none,
+    # warmUp() runs on a worker before the first request
+    def __init__(self, detect, workers=1, maxPending=2, warmUp=None):
+        self.detect = detect
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detection')
+        self.slots = threading.BoundedSemaphore(maxPending)
+        self.lock = threading.Lock()
+        self.lastKnown = {}
+        self.refused = 0
+        if warmUp:
+            self.executor.submit(warmUp).add_done_callback(self.reportFailure)
+
+    # Future of detect(key), or None when maxPending requests are already waiting or running
+    def submit(self, key):
+        if not self.slots.acquire(blocking=False):
+            self.refused += 1
+            return None
+        future = self.executor.submit(self.detect, key)
+        future.add_done_callback(lambda done: self.finished(key, done))
+        return future
+
+    def finished(self, key, future):
+        self.slots.release()
+        if self.reportFailure(future):
+            return
+        result = future.result()
+        if result is not None:
+            with self.lock:
+                self.lastKnown[key] = result
+
+    # True when the future was cancelled or raised, which is printed
+    def reportFailure(self, future):
+        if future.cancelled():
+            return True
+        if future.exception() is not None:
+            print("Detection failed:", future.exception())
+            return True
+        return False
+
+    # Latest result of key, None before the first one
+    def last(self, key):
+        with self.lock:
+            return self.lastKnown.get(key)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,94 @@
+# Queue of the vehicles of one lane of one approach
+# Vehicles are linked to their leader and follower in spawn order, so spawning,
+# crossing the stop line and retiring a vehicle are all O(1), and the number of
+# vehicles still waiting per class is always up to date for the green-time formula.
+
+class LaneQueue:
+    def __init__(self, directionNumber, lane, startX, startY, defaultStop, gap):
+        self.directionNumber = directionNumber
+        self.lane = lane
+        self.startX = startX
+        self.startY = startY
+        self.defaultStop = defaultStop
+        self.gap = gap
+        self.horizontal = (directionNumber%2==0)               # right and left drive along x
+        self.sign = 1 if directionNumber in (0, 1) else -1      # right and down drive towards growing coordinates
+        self.head = None        # oldest vehicle still on the lane
+        self.tail = None        # last spawned vehicle
+        self.length = 0
+        self.waiting = 0        # vehicles that have not crossed the stop line
+        self.waitingCounts = {}
+        self.spawned = 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        vehicle = self.head
+        while vehicle is not None:
+            yield vehicle
+            vehicle = vehicle.follower
+
+    # Start coordinates and stop coordinate for a new vehicle of the given size:
+    # right behind the tail, or at the start of the lane once the tail has moved on,
+    # and stopping behind the tail while it waits at the signal
+    def place(self, width, height):
+        tail = self.tail
+        if tail is None:
+            return self.startX, self.startY, self.defaultStop
+        if self.horizontal:
+            start, size, tailPos, tailSize = self.startX, width, tail.x, tail.width
+        else:
+            start, size, tailPos, tailSize = self.startY, height, tail.y, tail.height
+        if(self.sign>0):
+            pos = min(start, tailPos - self.gap - size)
+        else:
+            pos = max(start, tailPos + tailSize + self.gap)
+        if(tail.crossed==0):
+            stop = tail.stop - self.sign*(tailSize + self.gap)
+        else:
+            stop = self.defaultStop
+        if self.horizontal:
+            return pos, self.startY, stop
+        return self.startX, pos, stop
+
+    # Line a new vehicle of the given size up behind the tail, which becomes its leader,
+    # register it in the vehicle store, which sets vehicle.slot, and append it
+    def spawn(self, vehicle, store, width, height, speed, willTurn, group=0, spawned=0):
+        startX, startY, stop = self.place(width, height)
+        leader = self.tail.slot if self.tail is not None else -1
+        vehicle.slot = store.add(vehicle, self.directionNumber, self.lane, startX, startY, width, height, speed, stop,
+                                 willTurn, leader, group, spawned)
+        self.append(vehicle)
+
+    # index is only given when a vehicle of a snapshot is put back on its lane
+    def append(self, vehicle, index=None):
+        vehicle.leader = self.tail
+        vehicle.follower = None
+        vehicle.index = self.spawned if index is None else index   # position in spawn order, never renumbered
+        if self.tail is None:
+            self.head = vehicle
+        else:
+            self.tail.follower = vehicle
+        self.tail = vehicle
+        self.spawned = vehicle.index + 1
+        self.length += 1
+        self.waiting += 1
+        self.waitingCounts[vehicle.vehicleClass] = self.waitingCounts.get(vehicle.vehicleClass, 0) + 1
+
+    def markCrossed(self, vehicle):
+        self.waiting -= 1
+        self.waitingCounts[vehicle.vehicleClass] -= 1
+
+    def remove(self, vehicle):
+        if vehicle.leader is None:
+            self.head = vehicle.follower
+        else:
+            vehicle.leader.follower = vehicle.follower
+        if vehicle.follower is None:
+            self.tail = vehicle.leader
+        else:
+            vehicle.follower.leader = vehicle.leader
+        vehicle.leader = None
+        vehicle.follower = None
+        self.length -= 1
@@ -0,0 +1,63 @@
+# Streaming metrics of a simulation run
+# Records are kept in memory column by column and written out in chunks of batchSize
+# rows, one file per chunk, so long runs never hold more than a batch and the tick
+# loop only pays for appending to a few lists. Chunks are CSV files, or Parquet
+# files when pyarrow is installed and fileFormat is 'parquet'.
+import csv
+import os
+
+# One row per vehicle, written when it crosses the stop line or, with crossed NaN, for
+# the vehicles still waiting when the log is closed. Times are simulated seconds, wait
+# is the time spent standing before the stop line.
+vehicleColumns = ['direction', 'lane', 'vehicleClass', 'willTurn', 'spawned', 'crossed', 'wait', 'stops']
+# One row per green phase, written when it turns yellow
+phaseColumns = ['signal', 'start', 'green', 'queueStart', 'queueEnd', 'served']
+
+class Table:
+    def __init__(self, folder, name, columns, batchSize, fileFormat):
+        self.folder = folder
+        self.name = name
+        self.columns = columns
+        self.batchSize = batchSize
+        self.fileFormat = fileFormat
+        self.data = [[] for column in columns]
+        self.rows = 0
+        self.chunks = 0
+
+    def append(self, *values):
+        for column, value in zip(self.data, values):
+            column.append(value)
+        self.rows += 1
+        if(self.rows>=self.batchSize):
+            self.flush()
+
+    def flush(self):
+        if(self.rows==0):
+            return
+        path = os.path.join(self.folder, self.name + '_' + str(self.chunks).zfill(5) + '.' + self.fileFormat)
+        if(self.fileFormat=='parquet'):
+            import pyarrow
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(pyarrow.table(dict(zip(self.columns, self.data))), path)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(self.columns)
+                writer.writerows(zip(*self.data))
+        self.data = [[] for column in self.columns]
+        self.rows = 0
+        self.chunks += 1
+
+class MetricsLog:
+    def __init__(self, folder, fileFormat='csv', batchSize=10000):
+        if fileFormat not in ('csv', 'parquet'):
+            raise ValueError('unknown metrics format: ' + fileFormat)
+        if(fileFormat=='parquet'):
+            import pyarrow     # fail now rather than at the first flush
+        os.makedirs(folder, exist_ok=True)
+        self.vehicles = Table(folder, 'vehicles', vehicleColumns, batchSize, fileFormat)
+        self.phases = Table(folder, 'phases', phaseColumns, batchSize, fileFormat)
+
+    def close(self):
+        self.vehicles.flush()
+        self.phases.flush()
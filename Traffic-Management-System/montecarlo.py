@@ -0,0 +1,93 @@
+# Batch runner comparing the throughput of signal controllers, Static vs Dynamic by default
+# Runs seeded headless repetitions of each controller variant across a process pool
+# and writes the per-run table plus mean, stdev and 95% confidence interval per variant.
+# Any set of the controllers in simulation.py can be compared on the same seeds.
+#   python montecarlo.py --runs 100 --duration 300
+#   python montecarlo.py --controllers fixed lanes actuated maxpressure --demand poisson
+#   python montecarlo.py --demand hourly --start-hour 6 --hour-length 30
+#   python montecarlo.py --profile modified
+import argparse
+import csv
+import math
+import os
+import statistics
+from worker_pool import mapTasks
+from arrivals import demands
+
+# Green-time strategy of each variant, see strategies in simulation.py
+variants = {'Static': 'fixed', 'Dynamic': 'lanes'}
+
+def runOnce(task):
+    variant, strategy, seed, duration, demand, startHour, hourLength, profile = task
+    import simulation
+    simulation.configure(profile, strategy)
+    simulation.demand = demand
+    simulation.startHour = startHour
+    simulation.hourLength = hourLength
+    simulation.runHeadless(duration, seed)
+    lanes = [simulation.vehicles[simulation.directionNumbers[i]]['crossed'] for i in range(simulation.noOfSignals)]
+    return {'variant': variant, 'seed': seed, 'lanes': lanes, 'total': sum(lanes),
+            'perSecond': sum(lanes)/float(simulation.timeElapsed), 'wait': simulation.averageWait()}
+
+def summarize(results, names=variants):
+    summary = []
+    for variant in names:
+        totals = [result['total'] for result in results if result['variant']==variant]
+        if not totals:
+            continue
+        mean = statistics.mean(totals)
+        stdev = statistics.stdev(totals) if len(totals)>1 else 0.0
+        margin = 1.96*stdev/math.sqrt(len(totals))     # normal approximation
+        wait = statistics.mean(result['wait'] for result in results if result['variant']==variant)
+        summary.append({'variant': variant, 'runs': len(totals), 'mean': mean, 'stdev': stdev,
+                        'ciLow': mean-margin, 'ciHigh': mean+margin, 'wait': wait})
+    return summary
+
+# variants maps the name of each variant to its strategy, demand is the arrival pattern
+# (startHour and hourLength place the hourly one in the day) and profile the intersection geometry
+def runBatch(runs, duration, firstSeed=0, processes=None, variants=variants, demand='regular', profile='first',
+             startHour=8, hourLength=60):
+    # every variant sees the same seeds, so run i of each is a paired comparison
+    tasks = [(variant, strategy, firstSeed+i, duration, demand, startHour, hourLength, profile)
+             for i in range(runs) for variant, strategy in variants.items()]
+    results = mapTasks(runOnce, tasks, processes)
+    return results, summarize(results, variants)
+
+def writeResults(path, results, summary):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Variant', 'Seed', 'Lane 1', 'Lane 2', 'Lane 3', 'Lane 4', 'Total', 'Per second', 'Average wait'])
+        for result in results:
+            writer.writerow([result['variant'], result['seed']] + result['lanes'] +
+                            [result['total'], round(result['perSecond'], 4), round(result['wait'], 2)])
+    root, ext = os.path.splitext(path)
+    with open(root + '_summary' + ext, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Variant', 'Runs', 'Mean', 'Stdev', 'CI low', 'CI high', 'Average wait'])
+        for row in summary:
+            writer.writerow([row['variant'], row['runs'], round(row['mean'], 2), round(row['stdev'], 2),
+                             round(row['ciLow'], 2), round(row['ciHigh'], 2), round(row['wait'], 2)])
+
+if __name__ == '__main__':
+    from simulation import profiles, startHour, hourLength
+    parser = argparse.ArgumentParser(description='Seeded headless comparison of signal controllers')
+    parser.add_argument('--runs', type=int, default=100, help='repetitions per variant')
+    parser.add_argument('--duration', type=int, default=300, help='simulated seconds per run')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first run')
+    parser.add_argument('--controllers', nargs='+', default=None,
+                        help='strategies of simulation.py to compare instead of Static and Dynamic')
+    parser.add_argument('--demand', default='regular', choices=demands, help='arrival pattern, see arrivals.py')
+    parser.add_argument('--start-hour', type=int, default=startHour, help='hour of the day the hourly demand starts at')
+    parser.add_argument('--hour-length', type=float, default=hourLength, help='simulated seconds per hour of the hourly demand')
+    parser.add_argument('--profile', default='first', choices=sorted(profiles), help='intersection geometry, see profiles in simulation.py')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--out', default='Charts/montecarlo.csv', help='per-run table, the summary goes next to it')
+    args = parser.parse_args()
+
+    chosen = {name: name for name in args.controllers} if args.controllers else variants
+    results, summary = runBatch(args.runs, args.duration, args.seed, args.processes, chosen, args.demand, args.profile,
+                                args.start_hour, args.hour_length)
+    writeResults(args.out, results, summary)
+    for row in summary:
+        print(row['variant'], ': mean', round(row['mean'], 2), 'stdev', round(row['stdev'], 2),
+              '95% CI', (round(row['ciLow'], 2), round(row['ciHigh'], 2)), 'average wait', round(row['wait'], 2))
@@ -0,0 +1,58 @@
+# Timers for the stages of the tick and render loop
+# Each stage keeps its last window durations, so the percentiles follow what the
+# simulation is doing now rather than the whole run. Timing is switched on and off
+# at runtime; while it is off a stage costs a method call and an empty with block.
+#   with profiler.stage('move'):
+#       moveVehicles()
+import collections
+import contextlib
+import csv
+import time
+import numpy as np
+
+class Timing:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+class Profiler:
+    def __init__(self, window=1000):
+        self.enabled = False
+        self.window = window
+        self.samples = {}   # stage -> durations in seconds, the newest window of them
+        self.idle = contextlib.nullcontext()
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.idle
+        return Timing(self, name)
+
+    # Also called from other threads, a deque append is atomic
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples.setdefault(name, collections.deque(maxlen=self.window))
+        samples.append(seconds)
+
+    # (stage, samples, p50, p95, p99) per stage, times in milliseconds
+    def summary(self):
+        rows = []
+        for name, samples in list(self.samples.items()):
+            values = np.array(samples.copy())*1e3
+            if len(values):
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                rows.append((name, len(values), float(p50), float(p95), float(p99)))
+        return rows
+
+    def dump(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Stage', 'Samples', 'p50 ms', 'p95 ms', 'p99 ms'])
+            for name, count, p50, p95, p99 in self.summary():
+                writer.writerow([name, count, round(p50, 4), round(p95, 4), round(p99, 4)])
@@ -0,0 +1,70 @@
+# Dirty-rectangle renderer for the simulation window
+# The background is drawn once; on every frame only the areas vehicles left or
+# entered and the overlays whose content changed are redrawn and pushed to the
+# display with pygame.display.update(rects).
+import pygame
+
+class CachedText:
+    # Text surface that is only rendered again when its value changes
+    def __init__(self, font, colour, background, position):
+        self.font = font
+        self.colour = colour
+        self.background = background
+        self.position = position
+        self.value = None
+        self.surface = None
+        self.rect = None
+
+    def set(self, value):
+        if self.surface is not None and value==self.value:
+            return None
+        old = self.rect
+        self.value = value
+        self.surface = self.font.render(str(value), True, self.colour, self.background)
+        self.rect = self.surface.get_rect(topleft=self.position)
+        return self.rect if old is None else self.rect.union(old)
+
+class Renderer:
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self.bounds = screen.get_rect()
+        self.vehicleRects = []      # areas covered by vehicles on the last frame
+        self.images = {}            # overlay key -> image drawn last
+        self.dirty = [self.bounds]  # the first frame goes out in full
+        screen.blit(background, (0,0))
+
+    # Paint the background over the vehicles of the last frame
+    def clearVehicles(self):
+        for rect in self.vehicleRects:
+            self.screen.blit(self.background, rect, rect)
+        self.dirty.extend(self.vehicleRects)
+
+    # Overlays are blitted on every frame, cheap next to a full background, so
+    # vehicles passing underneath never wipe them, but only sent to the display when changed
+    def drawImage(self, key, image, position):
+        if self.images.get(key) is not image:
+            self.images[key] = image
+            self.dirty.append(image.get_rect(topleft=position))
+        self.screen.blit(image, position)
+
+    def drawText(self, text, value):
+        changed = text.set(value)
+        if changed is not None:
+            self.screen.blit(self.background, changed, changed)
+            self.dirty.append(changed)
+        self.screen.blit(text.surface, text.position)
+
+    # vehicles holds (image, x, y) of every vehicle
+    def drawVehicles(self, vehicles):
+        rects = []
+        for image, x, y in vehicles:
+            rect = self.screen.blit(image, (x, y))
+            if rect.width and rect.height:  # queued vehicles outside the window have nothing to update
+                rects.append(rect)
+        self.vehicleRects = rects
+        self.dirty.extend(rects)
+
+    def update(self):
+        pygame.display.update(self.dirty)
+        self.dirty = []
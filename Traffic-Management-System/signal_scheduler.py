@@ -0,0 +1,160 @@
+# Event-driven signal controller
+# Phase changes are events in a time-ordered queue instead of a loop that sleeps
+# once a second and recurses at the end of every cycle. The tick loop hands it the
+# simulated time of every tick, live or batch, so its state is only ever touched
+# from that one thread and needs no locking.
+import heapq
+import math
+import time
+
+# Event kinds, in the order they are handled when due at the same time
+DETECT = 0
+GREEN_END = 1
+YELLOW_END = 2
+
+class WallClock:
+    # secondLength is the wall time of one simulated second at speed 1, speed is the
+    # playback multiplier (2 runs twice as fast)
+    def __init__(self, secondLength=1, speed=1):
+        self.secondLength = secondLength
+        self.speed = speed
+        self.origin = 0.0
+        self.start = time.monotonic()
+
+    def time(self):
+        return self.origin + (time.monotonic() - self.start)*self.speed/self.secondLength
+
+    # Change the multiplier from now on, the time already elapsed is kept
+    def setSpeed(self, speed):
+        self.resync(self.time())
+        self.speed = speed
+
+    # Carry on from simulated time now, used when the machine cannot keep up
+    def resync(self, now):
+        self.origin = now
+        self.start = time.monotonic()
+
+class SimulatedClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class SignalScheduler:
+    # onDetect(signal) is called detectionTime seconds before signal, the next in turn,
+    # turns green and is expected to set signals[signal].green, or to pick another signal
+    # with setNext() and set its green. onGreen(signal) is called when signal turns green,
+    # onExtend(signal) when its green runs out and returns the seconds to extend it by,
+    # onYellow(signal) when it turns yellow and onChange() after every handled event.
+    def __init__(self, signals, clock, detectionTime, defaultRed, defaultYellow, defaultGreen,
+                 onDetect=None, onYellow=None, onChange=None, onGreen=None, onExtend=None):
+        self.signals = signals
+        self.clock = clock
+        self.detectionTime = detectionTime
+        self.defaultRed = defaultRed
+        self.defaultYellow = defaultYellow
+        self.defaultGreen = defaultGreen
+        self.onDetect = onDetect
+        self.onYellow = onYellow
+        self.onChange = onChange
+        self.onGreen = onGreen
+        self.onExtend = onExtend
+        self.events = []
+        self.order = 0
+        self.phase = (0, 0)     # (currentGreen, currentYellow), always replaced as a whole
+        self.greenTime = 0      # length of the current green phase
+        self.greenEnd = 0
+        self.yellowEnd = 0
+        self.next = 0           # signal that turns green after the current one
+
+    def schedule(self, at, kind, signal):
+        heapq.heappush(self.events, (at, kind, self.order, signal))
+        self.order += 1
+
+    def start(self, first=0):
+        self.beginGreen(first, self.clock.time())
+
+    def beginGreen(self, signal, now):
+        self.next = (signal+1)%len(self.signals)
+        self.greenTime = self.signals[signal].green
+        self.greenEnd = now + self.greenTime
+        self.yellowEnd = self.greenEnd + self.signals[signal].yellow
+        self.signals[self.next].red = math.ceil(self.yellowEnd - now)
+        self.phase = (signal, 0)
+        if self.onGreen:
+            self.onGreen(signal)
+        self.schedule(max(now, self.yellowEnd-self.detectionTime), DETECT, self.next)
+        self.schedule(self.greenEnd, GREEN_END, signal)
+
+    # Turn signal green after the current one instead of the next in turn
+    def setNext(self, signal):
+        if(signal==self.next):
+            return
+        self.signals[self.next].red = self.defaultRed
+        self.next = signal
+        self.signals[signal].red = max(0, math.ceil(self.yellowEnd - self.clock.time()))
+
+    def handle(self, at, kind, signal):
+        if(kind==DETECT):
+            if self.onDetect:
+                self.onDetect(signal)
+        elif(kind==GREEN_END):
+            extension = self.onExtend(signal) if self.onExtend else 0
+            if(extension>0):
+                # the signal after this one has already been decided on, only its wait grows
+                self.greenTime += extension
+                self.greenEnd += extension
+                self.yellowEnd += extension
+                self.signals[self.next].red = math.ceil(self.yellowEnd - at)
+                self.schedule(self.greenEnd, GREEN_END, signal)
+                if self.onChange:
+                    self.onChange()
+                return
+            self.signals[signal].totalGreenTime += self.greenTime
+            self.phase = (signal, 1)
+            if self.onYellow:
+                self.onYellow(signal)
+            self.schedule(self.yellowEnd, YELLOW_END, signal)
+        elif(kind==YELLOW_END):
+            # reset all signal times of the signal to default times and hand over to the next one
+            self.signals[signal].red = self.defaultRed
+            self.signals[signal].yellow = self.defaultYellow
+            self.signals[signal].green = self.defaultGreen
+            self.beginGreen(self.next, at)
+        if self.onChange:
+            self.onChange()
+
+    # Handle every event due up to now, called by the tick loop
+    def runUntil(self, now):
+        while self.events and self.events[0][0]<=now:
+            at, kind, order, signal = heapq.heappop(self.events)
+            self.handle(at, kind, signal)
+
+    # Pending events and current phase, everything needed to carry on with restore()
+    def snapshot(self):
+        return {'events': list(self.events), 'order': self.order, 'phase': self.phase,
+                'greenTime': self.greenTime, 'greenEnd': self.greenEnd, 'yellowEnd': self.yellowEnd,
+                'next': self.next}
+
+    def restore(self, state):
+        self.events = list(state['events'])     # a copy of a heap is still a heap
+        self.order = state['order']
+        self.phase = tuple(state['phase'])
+        self.greenTime = state['greenTime']
+        self.greenEnd = state['greenEnd']
+        self.yellowEnd = state['yellowEnd']
+        self.next = state['next']
+
+    # Refresh the countdowns shown next to the signals from the event times
+    def updateTimers(self):
+        now = self.clock.time()
+        currentGreen, currentYellow = self.phase
+        if(currentYellow==0):
+            self.signals[currentGreen].green = max(0, math.ceil(self.greenEnd - now))
+        else:
+            self.signals[currentGreen].yellow = max(0, math.ceil(self.yellowEnd - now))
+        self.signals[self.next].red = max(0, math.ceil(self.yellowEnd - now))
@@ -6,16 +6,28 @@
 # Distribution using python class
 
 # *** IMAGE XY COOD IS TOP LEFT
-import random
 import math
-import time
+import pickle
+import argparse
+import zlib
 import threading
+import time
+import collections
 # from vehicle_detection import detection
 import pygame
 import sys
 import os
-from vehicle_detection import detect_vehicles
+from assets import vehicleImage, rotatedImage, convertImages, preload, cacheStats
+from renderer import Renderer, CachedText
+from metrics import MetricsLog
+from arrivals import buildSchedule, restoreSchedule, demands
+from controllers import Controller, Observation, FixedTime, Formula, Actuated, MaxPressure
+from profiler import Profiler
+from detection_service import DetectionService
 import cv2
+from vehicle_store import VehicleStore, StoredVehicle
+from lane_queue import LaneQueue
+from signal_scheduler import SignalScheduler, WallClock, SimulatedClock
 # options={
 #    'model':'./cfg/yolo.cfg',     #specifying the path of model
 #    'load':'./bin/yolov2.weights',   #weights
@@ -29,16 +41,26 @@ defaultRed = 150
 defaultYellow = 5
 defaultGreen = 20
 defaultMinimum = 10
-defaultMaximum = 60
-camera = cv2.VideoCapture(0)
+camera = None       # opened on first detection, headless runs never touch it
+staticGreenTime = 30    # green time of every signal with the fixed strategy
 signals = []
 noOfSignals = 4
 simTime = 300       # change this to change time of simulation
 timeElapsed = 0
 
-currentGreen = 0   # Indicates which signal is green
-nextGreen = (currentGreen+1)%noOfSignals
-currentYellow = 0   # Indicates whether yellow signal is on or off 
+scheduler = None    # SignalScheduler, its phase tells which signal is green and whether it is yellow
+controller = None   # Controller of the run, made by initialize() from the strategy
+tick = 0            # frames moved so far in headless runs
+metrics = None      # MetricsLog, see enableMetrics()
+profiler = Profiler()   # stage timers, off until enabled with P in the window or --timings
+timingsFile = None  # where the stage timings are written on exit
+phaseStart = (0, 0) # vehicles waiting and crossed count of the green direction when it turned green
+crossedWait = 0     # frames the crossed vehicles spent standing before the stop line, see averageWait()
+
+# Playback speeds of the live window, changed with the up and down arrow keys
+speedSteps = [0.5, 1, 2, 5, 10, 20, 50]
+maxFrameRate = 60   # frames drawn per wall second at most, faster playback skips frames
+maxFrameTime = 0.1  # wall seconds of ticks per frame before playback falls back to what the machine manages
 
 # Average times for vehicles to pass the intersection
 carTime = 2
@@ -58,37 +80,108 @@ noOfLanes = 2 #this is the number of lanes in the intersection whic can be chang
 # Red signal time at which cars will be detected at a signal
 detectionTime = 5
 
-speeds = {'car':2.25, 'bus':1.8, 'truck':1.8, 'rickshaw':2, 'bike':2.5}  # average speeds of vehicles
-
-# Coordinates of start
-x = {'right':[0,0,0], 'down':[271,254,240], 'left':[1400,1400,1400], 'up':[200,210,225]}    
-y = {'right':[223,232,250], 'down':[0,0,0], 'left':[300,285,268], 'up':[800,800,800]}
-
-vehicles = {'right': {0:[], 1:[], 2:[], 'crossed':0}, 'down': {0:[], 1:[], 2:[], 'crossed':0}, 'left': {0:[], 1:[], 2:[], 'crossed':0}, 'up': {0:[], 1:[], 2:[], 'crossed':0}}
 vehicleTypes = {0:'car', 1:'bus', 2:'truck', 3:'rickshaw', 4:'bike'}
 directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
 
-# Coordinates of signal image, timer, and vehicle count
-'''Changes of the Singnal Coods'''
-signalCoods = [(590,340),(675,260),(770,430),(675,510)]
+# Coordinates of signal timer and vehicle count
 signalTimerCoods = [(530,210),(810,210),(810,550),(530,550)]
 vehicleCountCoods = [(480,210),(880,210),(880,550),(480,550)]
 vehicleCountTexts = ["0", "0", "0", "0"]
 
-# Coordinates of stop lines
-stopLines = {'right': 210, 'down': 220, 'left': 270, 'up': 307}
-defaultStop = {'right': 200, 'down': 210, 'left': 280, 'up': 317}
-stops = {'right': [200,200,200], 'down': [320,320,320], 'left': [810,810,810], 'up': [545,545,545]}
-
 mid = {'right': {'x':705, 'y':445}, 'down': {'x':695, 'y':450}, 'left': {'x':695, 'y':425}, 'up': {'x':695, 'y':400}}
 rotationAngle = 3
-
-# Gap between vehicles
-gap = 7    # stopping gap
-gap2 = 7   # moving gap
-
+ticksPerSecond = 60     # vehicle moves per simulated second, the live window is capped at the same frame rate
+
+# Size of the canvas, vehicles that leave it are retired
+screenWidth = 1400
+screenHeight = 800
+
+# Vehicles of the run, drawn in advance by scheduleArrivals() and spawned by step() when due
+arrivals = None
+demand = 'regular'  # regular, poisson or hourly, see buildSchedule() in arrivals.py
+startHour = 8       # hour of the day the hourly demand starts at
+hourLength = 60     # simulated seconds per hour of the hourly demand
+
+# Queue of every lane, plus the number of vehicles that crossed the stop line per direction
+def laneQueues(number, direction):
+    lanes = {'crossed': 0}
+    for lane in range(0,3):
+        lanes[lane] = LaneQueue(number, lane, x[direction][lane], y[direction][lane], defaultStop[direction], gap)
+    return lanes
+
+# Geometry profiles: the intersection image, where vehicles start and stop on it and how
+# they move. Times are in simulated seconds, secondLength is the wall time of one of them.
+profiles = {
+    # first.png
+    'first': {
+        'background': 'first.png',
+        'speeds': {'car':2.25, 'bus':1.8, 'truck':1.8, 'rickshaw':2, 'bike':2.5},     # average speeds of vehicles
+        'x': {'right':[0,0,0], 'down':[271,254,240], 'left':[1400,1400,1400], 'up':[200,210,225]},   # coordinates of start
+        'y': {'right':[223,232,250], 'down':[0,0,0], 'left':[300,285,268], 'up':[800,800,800]},
+        'signalCoods': [(590,340),(675,260),(770,430),(675,510)],
+        'stopLines': {'right': 210, 'down': 220, 'left': 270, 'up': 307},
+        'defaultStop': {'right': 200, 'down': 210, 'left': 280, 'up': 317},
+        'gap': 7,   # stopping gap
+        'gap2': 7,  # moving gap
+        'defaultMaximum': 60,
+        'spawnInterval': 0.25,
+        'secondLength': 1,
+    },
+    # images/mod_int.png, formerly "simulation Dy.py" and "simulation state.py"
+    'modified': {
+        'background': 'images/mod_int.png',
+        'speeds': {'car':4, 'bus':3, 'truck':3, 'rickshaw':4, 'bike':4.5},
+        'x': {'right':[0,0,0], 'down':[755,727,697], 'left':[1400,1400,1400], 'up':[602,627,657]},
+        'y': {'right':[348,370,398], 'down':[0,0,0], 'left':[498,466,436], 'up':[800,800,800]},
+        'signalCoods': [(530,230),(810,230),(810,570),(530,570)],
+        'stopLines': {'right': 590, 'down': 330, 'left': 800, 'up': 535},
+        'defaultStop': {'right': 580, 'down': 320, 'left': 810, 'up': 545},
+        'gap': 15,
+        'gap2': 15,
+        'defaultMaximum': 40,
+        'spawnInterval': 0.75,  # a vehicle every 0.5 s of wall time
+        'secondLength': 0.667,  # the signal timers of these scripts ticked every 0.667 s
+    },
+}
+
+vehicles = {}
 pygame.init()
 simulation = pygame.sprite.Group()
+store = None
+
+# Empty lanes and vehicle store for the geometry of the current profile
+def resetLanes():
+    global store
+    for number, direction in directionNumbers.items():
+        vehicles[direction] = laneQueues(number, direction)
+    store = VehicleStore([stopLines[directionNumbers[i]] for i in range(0,4)],
+                         [mid['right']['x'], mid['down']['y'], mid['left']['x'], mid['up']['y']],
+                         gap2, rotationAngle)
+
+# Select the geometry profile and the green-time strategy, before any vehicle is spawned
+def configure(profileName=None, strategyName=None):
+    global profile, background, speeds, x, y, signalCoods, stopLines, defaultStop, gap, gap2
+    global defaultMaximum, spawnInterval, secondLength, strategy
+    if profileName is not None:
+        settings = profiles[profileName]
+        profile = profileName
+        background = settings['background']
+        speeds = settings['speeds']
+        x = settings['x']
+        y = settings['y']
+        signalCoods = settings['signalCoods']
+        stopLines = settings['stopLines']
+        defaultStop = settings['defaultStop']
+        gap = settings['gap']
+        gap2 = settings['gap2']
+        defaultMaximum = settings['defaultMaximum']
+        spawnInterval = settings['spawnInterval']
+        secondLength = settings['secondLength']
+        resetLanes()
+    if strategyName is not None:
+        if strategyName not in strategies:
+            raise ValueError('unknown green time strategy: ' + strategyName)
+        strategy = strategyName
 
 class TrafficSignal:
     def __init__(self, red, yellow, green, minimum, maximum):
@@ -100,174 +193,77 @@ class TrafficSignal:
         self.signalText = "30"
         self.totalGreenTime = 0
         
-class Vehicle(pygame.sprite.Sprite):
-    def __init__(self, lane, vehicleClass, direction_number, direction, will_turn):
+# Position and state live in the shared vehicle store
+class Vehicle(pygame.sprite.Sprite, StoredVehicle):
+    # slot is only given when a vehicle of a snapshot is put back, its state is already in the store
+    def __init__(self, lane, vehicleClass, direction_number, direction, will_turn, slot=None, index=None):
         pygame.sprite.Sprite.__init__(self)
+        self.store = store
         self.lane = lane
         self.vehicleClass = vehicleClass
-        self.speed = speeds[vehicleClass]
         self.direction_number = direction_number
         self.direction = direction
-        self.x = x[direction][lane]
-        self.y = y[direction][lane]
-        self.crossed = 0
         self.willTurn = will_turn
-        self.turned = 0
-        self.rotateAngle = 0
-        vehicles[direction][lane].append(self)
-        # self.stop = stops[direction][lane]
-        self.index = len(vehicles[direction][lane]) - 1
-        path = "images/" + direction + "/" + vehicleClass + ".png"
-        self.originalImage = pygame.image.load(path)
-        self.currentImage = pygame.image.load(path)
-
-    
-        if(direction=='right'):
-            if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):    # if more than 1 vehicle in the lane of vehicle before it has crossed stop line
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().width - gap         # setting stop coordinate as: stop coordinate of next vehicle - width of next vehicle - gap
-            else:
-                self.stop = defaultStop[direction]
-            # Set new starting and stopping coordinate
-            temp = self.currentImage.get_rect().width + gap    
-            x[direction][lane] -= temp
-            stops[direction][lane] -= temp
-        elif(direction=='left'):
-            if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().width + gap
-            else:
-                self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().width + gap
-            x[direction][lane] += temp
-            stops[direction][lane] += temp
-        elif(direction=='down'):
-            if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().height - gap
-            else:
-                self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().height + gap
-            y[direction][lane] -= temp
-            stops[direction][lane] -= temp
-        elif(direction=='up'):
-            if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().height + gap
-            else:
-                self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().height + gap
-            y[direction][lane] += temp
-            stops[direction][lane] += temp
+        self.originalImage = vehicleImage(direction, vehicleClass)
+        self.currentImage = self.originalImage
+        if slot is not None:
+            self.slot = slot
+            if(self.rotateAngle):
+                self.currentImage = rotatedImage(direction, vehicleClass, self.rotateAngle)
+            queue = vehicles[direction][lane]
+            queue.append(self, index)
+            if(self.crossed):
+                queue.markCrossed(self)
+            simulation.add(self)
+            return
+        rect = self.currentImage.get_rect()
+        vehicles[direction][lane].spawn(self, store, rect.width, rect.height, speeds[vehicleClass], will_turn,
+                                        spawned=scheduler.clock.time() if scheduler else 0)
         simulation.add(self)
 
     def render(self, screen):
         screen.blit(self.currentImage, (self.x, self.y))
-        
-    def move(self):
-        if(self.direction=='right'):
-            if(self.crossed==0 and self.x+self.currentImage.get_rect().width>stopLines[self.direction]):   # if the image has crossed stop line now
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if(self.willTurn==1):
-                if(self.crossed==0 or self.x+self.currentImage.get_rect().width<mid[self.direction]['x']):
-                    if((self.x+self.currentImage.get_rect().width<=self.stop or (currentGreen==0 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
-                        self.x += self.speed
-                else:   
-                    if(self.turned==0):
-                        self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
-                        self.x += 2
-                        self.y += 1.8
-                        if(self.rotateAngle==90):
-                            self.turned = 1
-                            # path = "images/" + directionNumbers[((self.direction_number+1)%noOfSignals)] + "/" + self.vehicleClass + ".png"
-                            # self.x = mid[self.direction]['x']
-                            # self.y = mid[self.direction]['y']
-                            # self.image = pygame.image.load(path)
-                    else:
-                        if(self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2)):
-                            self.y += self.speed
-            else: 
-                if((self.x+self.currentImage.get_rect().width<=self.stop or self.crossed == 1 or (currentGreen==0 and currentYellow==0)) and (self.index==0 or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
-                # (if the image has not reached its stop coordinate or has crossed stop line or has green signal) and (it is either the first vehicle in that lane or it is has enough gap to the next vehicle in that lane)
-                    self.x += self.speed  # move the vehicle
-
-
-
-        elif(self.direction=='down'):
-            if(self.crossed==0 and self.y+self.currentImage.get_rect().height>stopLines[self.direction]):
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if(self.willTurn==1):
-                if(self.crossed==0 or self.y+self.currentImage.get_rect().height<mid[self.direction]['y']):
-                    if((self.y+self.currentImage.get_rect().height<=self.stop or (currentGreen==1 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
-                        self.y += self.speed
-                else:   
-                    if(self.turned==0):
-                        self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
-                        self.x -= 2.5
-                        self.y += 2
-                        if(self.rotateAngle==90):
-                            self.turned = 1
-                    else:
-                        if(self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or self.y<(vehicles[self.direction][self.lane][self.index-1].y - gap2)):
-                            self.x -= self.speed
-            else: 
-                if((self.y+self.currentImage.get_rect().height<=self.stop or self.crossed == 1 or (currentGreen==1 and currentYellow==0)) and (self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
-                    self.y += self.speed
-            
-        elif(self.direction=='left'):
-            if(self.crossed==0 and self.x<stopLines[self.direction]):
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if(self.willTurn==1):
-                if(self.crossed==0 or self.x>mid[self.direction]['x']):
-                    if((self.x>=self.stop or (currentGreen==2 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
-                        self.x -= self.speed
-                else: 
-                    if(self.turned==0):
-                        self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
-                        self.x -= 1.8
-                        self.y -= 2.5
-                        if(self.rotateAngle==90):
-                            self.turned = 1
-                            # path = "images/" + directionNumbers[((self.direction_number+1)%noOfSignals)] + "/" + self.vehicleClass + ".png"
-                            # self.x = mid[self.direction]['x']
-                            # self.y = mid[self.direction]['y']
-                            # self.currentImage = pygame.image.load(path)
-                    else:
-                        if(self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height +  gap2) or self.x>(vehicles[self.direction][self.lane][self.index-1].x + gap2)):
-                            self.y -= self.speed
-            else: 
-                if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
-                # (if the image has not reached its stop coordinate or has crossed stop line or has green signal) and (it is either the first vehicle in that lane or it is has enough gap to the next vehicle in that lane)
-                    self.x -= self.speed  # move the vehicle    
-            # if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2))):                
-            #     self.x -= self.speed
-        elif(self.direction=='up'):
-            if(self.crossed==0 and self.y<stopLines[self.direction]):
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if(self.willTurn==1):
-                if(self.crossed==0 or self.y>mid[self.direction]['y']):
-                    if((self.y>=self.stop or (currentGreen==3 and currentYellow==0) or self.crossed == 1) and (self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height +  gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):
-                        self.y -= self.speed
-                else:   
-                    if(self.turned==0):
-                        self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
-                        self.x += 1
-                        self.y -= 1
-                        if(self.rotateAngle==90):
-                            self.turned = 1
-                    else:
-                        if(self.index==0 or self.x<(vehicles[self.direction][self.lane][self.index-1].x - vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width - gap2) or self.y>(vehicles[self.direction][self.lane][self.index-1].y + gap2)):
-                            self.x += self.speed
-            else: 
-                if((self.y>=self.stop or self.crossed == 1 or (currentGreen==3 and currentYellow==0)) and (self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height + gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
-                    self.y -= self.speed
-
-# Initialization of signals with default values
-def initialize():
+
+# Move every vehicle by one frame and refresh the images of the turning ones
+def moveVehicles():
+    global crossedWait
+    currentGreen, currentYellow = scheduler.phase
+    crossed, rotated = store.move(currentGreen, currentYellow)
+    if(len(crossed)):
+        crossedWait += int(store.waited[crossed].sum())
+    for slot in crossed:
+        vehicle = store.owners[slot]
+        vehicles[vehicle.direction]['crossed'] += 1
+        vehicles[vehicle.direction][vehicle.lane].markCrossed(vehicle)
+        if metrics is not None:
+            metrics.vehicles.append(vehicle.direction_number, vehicle.lane, vehicle.vehicleClass, vehicle.willTurn,
+                                    float(store.spawned[slot]), scheduler.clock.time(),
+                                    int(store.waited[slot])/float(ticksPerSecond), int(store.stops[slot]))
+    for slot in rotated:
+        vehicle = store.owners[slot]
+        vehicle.currentImage = rotatedImage(vehicle.direction, vehicle.vehicleClass, vehicle.rotateAngle)
+        rect = vehicle.currentImage.get_rect()
+        store.width[slot] = rect.width
+        store.height[slot] = rect.height
+    for vehicle in store.retire(screenWidth, screenHeight):
+        retireVehicle(vehicle)
+
+# Forget a vehicle that has left the canvas, its crossing has already been counted
+def retireVehicle(vehicle):
+    vehicles[vehicle.direction][vehicle.lane].remove(vehicle)
+    simulation.remove(vehicle)
+
+# Initialization of signals with default values and of the scheduler that switches them
+def initialize(clock, onChange=None):
+    global scheduler, controller
+    initSignals()
+    controller = strategies[strategy]()
+    scheduler = SignalScheduler(signals, clock, detectionTime, defaultRed, defaultYellow, defaultGreen,
+                                onDetect=detect, onYellow=startYellow, onChange=onChange, onGreen=startGreen,
+                                onExtend=extend)
+    scheduler.start()
+
+def initSignals():
     ts1 = TrafficSignal(0, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
     signals.append(ts1)
     ts2 = TrafficSignal(ts1.red+ts1.yellow+ts1.green, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
@@ -276,37 +272,52 @@ def initialize():
     signals.append(ts3)
     ts4 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
     signals.append(ts4)
-    repeat()
 
-# Set time according to formula
-def setTime():
+# Called by the scheduler detectionTime seconds before signalNumber turns green
+def detect(signalNumber):
+    setTime(signalNumber)
+
+# Let the controller pick the signal after the current one, signalNumber is the next in
+# turn, and its green time
+def setTime(signalNumber):
+    signal, greenTime = controller.decide(observe(signalNumber))
+    if(signal!=signalNumber):
+        scheduler.setNext(signal)
+    if greenTime is not None:
+        signals[signal].green = greenTime
+
+# Called by the scheduler when the green of signalNumber runs out, returns the seconds to extend it by
+def extend(signalNumber):
+    return controller.extend(observe(scheduler.next))
+
+# What the controllers see of the junction, see Observation in controllers.py
+def observe(signalNumber):
+    now = scheduler.clock.time()
+    queues = tuple(tuple(vehicles[directionNumbers[i]][lane].waiting for lane in range(0,3)) for i in range(0,noOfSignals))
+    counts = tuple(laneCounts(directionNumbers[i]) for i in range(0,noOfSignals))
+    return Observation(signalNumber, scheduler.phase[0], queues, counts, now - (scheduler.greenEnd - scheduler.greenTime), now)
+
+# Formula green time on the YOLO counts of a camera frame, decided when they arrive
+class CameraController(Controller):
+    def decide(self, observation):
+        requestDetection(observation.signal)
+        return observation.signal, None     # set by applyDetections() once the counts arrive
+
+# Controller of each strategy, made when a run starts so they see the current settings
+strategies = {
+    'camera': CameraController,
+    'lanes': lambda: Formula(formulaGreenTime),                     # formula on the vehicles waiting in the simulated lanes
+    'fixed': lambda: FixedTime(staticGreenTime),                    # the same green time whatever the traffic
+    'actuated': lambda: Actuated(defaultMinimum, defaultMaximum),   # minimum green, extended while vehicles wait
+    'maxpressure': lambda: MaxPressure(defaultMinimum),             # the longest queue next, for a fixed slot
+}
+
+configure('first', 'camera')    # what simulation.py runs without options
+
+# Green time for the counted vehicles according to formula
+def formulaGreenTime(counts):
     global noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws
 
-    ret, frame = camera.read()
-    if not ret:
-        print("Camera not working!")
-        return
-
-    counts = detect_vehicles(frame)
-    print("YOLO Detected:", counts)
-
-
-    # 🆕 Add vehicles to simulation from camera detection
-    def spawn_from_camera(counts):
-        # this will only add vehicles if detected by camera
-        direction = directionNumbers[(currentGreen+1) % noOfSignals]
-        for _ in range(counts['car']):
-            Vehicle(1, 'car', (currentGreen+1)%4, direction, 0)
-        for _ in range(counts['bike']):
-            Vehicle(0, 'bike', (currentGreen+1)%4, direction, 0)
-        for _ in range(counts['bus']):
-            Vehicle(2, 'bus', (currentGreen+1)%4, direction, 1)
-        for _ in range(counts['truck']):
-            Vehicle(2, 'truck', (currentGreen+1)%4, direction, 0)
-
-    # 🧠 Actually call the function!
-    spawn_from_camera(counts)
-
     # Store detected counts
     noOfCars = counts['car']
     noOfBuses = counts['bus']
@@ -322,50 +333,164 @@ def setTime():
                            (noOfBikes * bikeTime)) / (noOfLanes + 1))
 
     # Clamp green time
-    greenTime = max(defaultMinimum, min(defaultMaximum, greenTime))
-
-    # Apply green time
-    signals[(currentGreen + 1) % noOfSignals].green = greenTime
-    cv2.imshow("Camera View", frame)
-    cv2.waitKey(1)
-
-
-def repeat():
-    global currentGreen, currentYellow, nextGreen
-    while(signals[currentGreen].green>0):   # while the timer of current green signal is not zero
-        printStatus()
-        updateValues()
-        if(signals[(currentGreen+1)%(noOfSignals)].red==detectionTime):    # set time of next green signal 
-            thread = threading.Thread(name="detection",target=setTime, args=())
-            thread.daemon = True
-            thread.start()
-            # setTime()
-        time.sleep(1)
-    currentYellow = 1   # set yellow signal on
-    vehicleCountTexts[currentGreen] = "0"
-    # reset stop coordinates of lanes and vehicles 
+    return max(defaultMinimum, min(defaultMaximum, greenTime))
+
+# Camera and YOLO are slow, so they run on the threads of a DetectionService. The tick
+# loop keeps the future of every requested signal with the simulated time the counts are
+# needed by, when the signal turns green. A result that is not there by then is replaced
+# by the last counts of that signal.
+detectionWorkers = 1    # threads reading the camera and running YOLO
+detectionBacklog = 2    # requests waiting or running at most, further ones use the last counts at once
+detection = None        # DetectionService, started with the camera strategy
+pendingDetections = {}  # signal -> (future or None when refused, deadline)
+detectionsInTime = 0
+detectionsMissed = 0    # deadline passed before the result
+detectionsRefused = 0   # backlog full, not even started
+detectionsFailed = 0    # raised, or the camera gave no frame
+cameraLock = threading.Lock()   # one camera read at a time when there are several workers
+
+# Start the detection workers, the first loads YOLO before taking any request
+def startDetection():
+    global detection
+    if detection is None:
+        detection = DetectionService(detectSignal, detectionWorkers, detectionBacklog, warmUpDetection)
+
+# Cancel the requests not started yet, the process exits once the running ones are done
+def stopDetection():
+    if detection is not None:
+        detection.shutdown()
+
+def warmUpDetection():
+    from vehicle_detection import warmUp    # imports torch, only needed with a camera
+    with profiler.stage('yolo warm-up'):
+        warmUp()
+
+def requestDetection(signalNumber):
+    startDetection()
+    pendingDetections[signalNumber] = (detection.submit(signalNumber), scheduler.yellowEnd)
+
+# Runs on a detection worker, (counts, frame) or None without a camera frame
+def detectSignal(signalNumber):
+    with profiler.stage('yolo'):
+        counts, frame = cameraCounts()
+    if counts is None:
+        return None
+    return counts, frame
+
+# Read a camera frame and count it with YOLO, runs on the detection thread
+def cameraCounts():
+    global camera
+    with cameraLock:
+        if camera is None:
+            camera = cv2.VideoCapture(0)
+        ret, frame = camera.read()
+    if not ret:
+        print("Camera not working!")
+        return None, None
+
+    from vehicle_detection import detect_vehicles
+    counts = detect_vehicles(frame, source=0)     # a frame like the last one counted reuses its counts
+    print("YOLO Detected:", counts)
+    return counts, frame
+
+# Apply the detections that arrived since the last tick: the green time of the signal and
+# the detected vehicles mirrored into the simulation. Requests past their deadline fall
+# back to the last counts of the signal, or keep the default green before there are any.
+def applyDetections():
+    global detectionsInTime, detectionsMissed, detectionsRefused, detectionsFailed
+    for signalNumber, (future, deadline) in list(pendingDetections.items()):
+        if future is None:
+            detectionsRefused += 1
+        elif future.done():
+            failed = future.cancelled() or future.exception() is not None     # already printed by the service
+            result = None if failed else future.result()
+            if result is None:
+                detectionsFailed += 1
+            else:
+                del pendingDetections[signalNumber]
+                detectionsInTime += 1
+                counts, frame = result
+                signals[signalNumber].green = formulaGreenTime(counts)
+                spawnFromCamera(signalNumber, counts)
+                cv2.imshow("Camera View", frame)
+                cv2.waitKey(1)
+                continue
+        elif scheduler.clock.time()<deadline:
+            continue
+        else:
+            future.cancel()     # only stops it if it has not started, a late result still updates the last counts
+            detectionsMissed += 1
+        del pendingDetections[signalNumber]
+        last = detection.last(signalNumber)
+        if last is not None:
+            signals[signalNumber].green = formulaGreenTime(last[0])
+
+# this will only add vehicles if detected by camera
+def spawnFromCamera(signalNumber, counts):
+    direction = directionNumbers[signalNumber]
+    for _ in range(counts['car']):
+        Vehicle(1, 'car', signalNumber, direction, 0)
+    for _ in range(counts['bike']):
+        Vehicle(0, 'bike', signalNumber, direction, 0)
+    for _ in range(counts['bus']):
+        Vehicle(2, 'bus', signalNumber, direction, 1)
+    for _ in range(counts['truck']):
+        Vehicle(2, 'truck', signalNumber, direction, 0)
+
+# Count the vehicles of a direction that have not crossed the stop line yet
+def laneCounts(direction):
+    counts = {'car': 0, 'truck': 0, 'bus': 0, 'bike': 0, 'rickshaw': 0}
     for i in range(0,3):
-        stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
-        for vehicle in vehicles[directionNumbers[currentGreen]][i]:
-            vehicle.stop = defaultStop[directionNumbers[currentGreen]]
-    while(signals[currentGreen].yellow>0):  # while the timer of current yellow signal is not zero
-        printStatus()
-        updateValues()
-        time.sleep(1)
-    currentYellow = 0   # set yellow signal off
-    
-    # reset all signal times of current signal to default times
-    signals[currentGreen].green = defaultGreen
-    signals[currentGreen].yellow = defaultYellow
-    signals[currentGreen].red = defaultRed
-       
-    currentGreen = nextGreen # set next signal as green signal
-    nextGreen = (currentGreen+1)%noOfSignals    # set next green signal
-    signals[nextGreen].red = signals[currentGreen].yellow+signals[currentGreen].green    # set the red time of next to next signal as (yellow time + green time) of next signal
-    repeat()     
+        for vehicleClass, count in vehicles[direction][i].waitingCounts.items():
+            counts[vehicleClass] += count
+    return counts
+
+
+def waitingVehicles(direction):
+    return sum(vehicles[direction][i].waiting for i in range(0,3))
+
+def startGreen(signalNumber):
+    global phaseStart
+    direction = directionNumbers[signalNumber]
+    phaseStart = (waitingVehicles(direction), vehicles[direction]['crossed'])
+
+def startYellow(signalNumber):
+    vehicleCountTexts[signalNumber] = "0"
+    # reset stop coordinates of the vehicles, new ones line up behind them again
+    store.resetStops(signalNumber, defaultStop[directionNumbers[signalNumber]])
+    if metrics is not None:
+        direction = directionNumbers[signalNumber]
+        metrics.phases.append(signalNumber, scheduler.greenEnd - scheduler.greenTime, scheduler.greenTime,
+                              phaseStart[0], waitingVehicles(direction), vehicles[direction]['crossed'] - phaseStart[1])
+
+# Record every crossing vehicle and every green phase to folder, see metrics.py
+def enableMetrics(folder, fileFormat='csv', batchSize=10000):
+    global metrics
+    metrics = MetricsLog(folder, fileFormat, batchSize)
+
+# Write out what is still buffered, call before the process exits. Vehicles still
+# before the stop line get a row too, with no crossing time, so the ones a signal
+# plan never served count in the waits.
+def closeMetrics():
+    global metrics
+    if metrics is not None:
+        for slot in range(store.size):
+            if store.alive[slot] and not store.crossed[slot]:
+                vehicle = store.owners[slot]
+                metrics.vehicles.append(vehicle.direction_number, vehicle.lane, vehicle.vehicleClass, vehicle.willTurn,
+                                        float(store.spawned[slot]), float('nan'),
+                                        int(store.waited[slot])/float(ticksPerSecond), int(store.stops[slot]))
+        metrics.close()
+        metrics = None
+
+# Write the stage percentiles when --timings asked for them, call before the process exits
+def dumpTimings():
+    if timingsFile is not None:
+        profiler.dump(timingsFile)
 
 # Print the signal timers on cmd
 def printStatus():                                                                                           
+	currentGreen, currentYellow = scheduler.phase
 	for i in range(0, noOfSignals):
 		if(i==currentGreen):
 			if(currentYellow==0):
@@ -376,87 +501,194 @@ def printStatus():
 			print("   RED TS",i+1,"-> r:",signals[i].red," y:",signals[i].yellow," g:",signals[i].green)
 	print()
 
-# Update values of the signal timers after every second
-def updateValues():
-    for i in range(0, noOfSignals):
-        if(i==currentGreen):
-            if(currentYellow==0):
-                signals[i].green-=1
-                signals[i].totalGreenTime+=1
-            else:
-                signals[i].yellow-=1
-        else:
-            signals[i].red-=1
-
 # Generating vehicles in the simulation
-def generateVehicles():
-    while(True):
-        vehicle_type = random.randint(0,4)
-        if(vehicle_type==4):
-            lane_number = 0
-        else:
-            lane_number = random.randint(0,1) + 1
-        will_turn = 0
-        if(lane_number==2):
-            temp = random.randint(0,4)
-            if(temp<=2):
-                will_turn = 1
-            elif(temp>2):
-                will_turn = 0
-        temp = random.randint(0,999)
-        direction_number = 0
-        a = [400,800,900,1000]
-        if(temp<a[0]):
-            direction_number = 0
-        elif(temp<a[1]):
-            direction_number = 1
-        elif(temp<a[2]):
-            direction_number = 2
-        elif(temp<a[3]):
-            direction_number = 3
-        Vehicle(lane_number, vehicleTypes[vehicle_type], direction_number, directionNumbers[direction_number], will_turn)
-        time.sleep(0.25)
-
-def simulationTime():
-    global timeElapsed, simTime
-    while(True):
+# Draw every arrival of a run of duration simulated seconds, a vehicle every spawnInterval
+# seconds on average
+def scheduleArrivals(duration, seed=None):
+    global arrivals
+    arrivals = buildSchedule(duration, spawnInterval, demand, seed, startHour, hourLength)
+
+# Spawn arrival i of the schedule
+def spawnArrival(i):
+    direction_number = int(arrivals.direction[i])
+    Vehicle(int(arrivals.lane[i]), vehicleTypes[int(arrivals.vehicleClass[i])], direction_number,
+            directionNumbers[direction_number], int(arrivals.willTurn[i]))
+
+# Mean seconds spent standing before the stop line, over the vehicles that crossed and the
+# ones still waiting, so a signal plan cannot look good by never serving a direction
+def averageWait():
+    n = store.size
+    waiting = store.alive[:n] & ~store.crossed[:n]
+    crossedCount = sum(vehicles[direction]['crossed'] for direction in vehicles)
+    count = crossedCount + int(waiting.sum())
+    if(count==0):
+        return 0.0
+    return (crossedWait + int(store.waited[:n][waiting].sum()))/float(count*ticksPerSecond)
+
+def printSummary():
+    totalVehicles = 0
+    print('Lane-wise Vehicle Counts')
+    for i in range(noOfSignals):
+        print('Lane',i+1,':',vehicles[directionNumbers[i]]['crossed'])
+        totalVehicles += vehicles[directionNumbers[i]]['crossed']
+    print('Total vehicles passed: ',totalVehicles)
+    print('Total time passed: ',timeElapsed)
+    if timeElapsed > 0:     # a window closed right away has no rate
+        print('No. of vehicles passed per unit time: ',(float(totalVehicles)/float(timeElapsed)))
+    images = cacheStats()
+    print('Vehicle images loaded: ',images['misses'],' reused: ',images['hits'],' turn frames: ',images['rotations'])
+    if detection is not None:
+        print('Detections in time: ',detectionsInTime,' missed: ',detectionsMissed,' refused: ',detectionsRefused,' failed: ',detectionsFailed)
+        from vehicle_detection import frameGate
+        print('Camera frames reused: ',frameGate.hits,' of ',frameGate.hits+frameGate.misses,' hit rate: ',round(frameGate.hitRate(), 3))
+
+# Full state of a headless run between two ticks: signals, scheduler, every vehicle
+# with its lane, the counters, the clock and the arrival schedule, pickled and compressed
+def snapshot():
+    state = {
+        'profile': profile,
+        'strategy': strategy,
+        'tick': tick,
+        'timeElapsed': timeElapsed,
+        'signals': [vars(signal).copy() for signal in signals],
+        'scheduler': scheduler.snapshot(),
+        'store': store.snapshot(),
+        # in spawn order, which is also the order on every lane
+        'vehicles': [(vehicle.slot, vehicle.lane, vehicle.vehicleClass, vehicle.direction_number, vehicle.willTurn, vehicle.index)
+                     for vehicle in simulation],
+        'spawned': {(direction, lane): vehicles[direction][lane].spawned for direction in vehicles for lane in range(0,3)},
+        'crossed': {direction: vehicles[direction]['crossed'] for direction in vehicles},
+        'counts': (noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws),
+        'phaseStart': phaseStart,
+        'crossedWait': crossedWait,
+        'arrivals': arrivals.snapshot(),
+    }
+    return zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+# Replace the current run with a snapshot(), the scheduler follows clock from then on
+def restore(data, clock, onChange=None):
+    global scheduler, tick, timeElapsed, noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws, phaseStart, crossedWait
+    global arrivals, controller
+    state = pickle.loads(zlib.decompress(data))
+    configure(state['profile'], state['strategy'])
+    tick = state['tick']
+    timeElapsed = state['timeElapsed']
+    signals[:] = []
+    for saved in state['signals']:
+        signal = TrafficSignal(saved['red'], saved['yellow'], saved['green'], saved['minimum'], saved['maximum'])
+        vars(signal).update(saved)
+        signals.append(signal)
+    controller = strategies[strategy]()
+    scheduler = SignalScheduler(signals, clock, detectionTime, defaultRed, defaultYellow, defaultGreen,
+                                onDetect=detect, onYellow=startYellow, onChange=onChange, onGreen=startGreen,
+                                onExtend=extend)
+    scheduler.restore(state['scheduler'])
+    for direction in vehicles:
+        vehicles[direction]['crossed'] = state['crossed'][direction]
+    simulation.empty()
+    owners = [None]*len(state['store']['alive'])
+    store.restore(state['store'], owners)
+    for slot, lane, vehicleClass, direction_number, will_turn, index in state['vehicles']:
+        # the same string objects as spawned vehicles use, so later snapshots pickle to the same bytes
+        vehicleClass = sys.intern(vehicleClass)
+        owners[slot] = Vehicle(lane, vehicleClass, direction_number, directionNumbers[direction_number], will_turn, slot, index)
+    store.owners[:len(owners)] = owners
+    for (direction, lane), spawned in state['spawned'].items():
+        vehicles[direction][lane].spawned = spawned
+    noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws = state['counts']
+    phaseStart = state['phaseStart']
+    crossedWait = state['crossedWait']
+    arrivals = restoreSchedule(state['arrivals'])
+
+# One tick of the model, the only place it changes: spawning, detections, signal
+# events, movement and the elapsed time. clock is the simulated clock of the scheduler.
+def step(clock):
+    global tick, timeElapsed
+    clock.now = tick/float(ticksPerSecond)
+    with profiler.stage('spawn'):
+        for i in arrivals.due(clock.now):
+            spawnArrival(i)
+    with profiler.stage('apply detections'):
+        applyDetections()
+    with profiler.stage('scheduler'):
+        scheduler.runUntil(clock.now)
+    with profiler.stage('move'):
+        moveVehicles()
+    tick += 1
+    if(tick%ticksPerSecond==0):
         timeElapsed += 1
-        time.sleep(1)
-        if(timeElapsed==simTime):
-            totalVehicles = 0
-            print('Lane-wise Vehicle Counts')
-            for i in range(noOfSignals):
-                print('Lane',i+1,':',vehicles[directionNumbers[i]]['crossed'])
-                totalVehicles += vehicles[directionNumbers[i]]['crossed']
-            print('Total vehicles passed: ',totalVehicles)
-            print('Total time passed: ',timeElapsed)
-            print('No. of vehicles passed per unit time: ',(float(totalVehicles)/float(timeElapsed)))
-            os._exit(1)
-    
-
-class Main:
-    thread4 = threading.Thread(name="simulationTime",target=simulationTime, args=()) 
-    thread4.daemon = True
-    thread4.start()
-
-    thread2 = threading.Thread(name="initialization",target=initialize, args=())    # initialization
-    thread2.daemon = True
-    thread2.start()
+
+# Immutable view of the model after a tick, all the window draws from
+Frame = collections.namedtuple('Frame', ['vehicles', 'phase', 'signals', 'crossed', 'timeElapsed'])
+
+def frameState():
+    scheduler.updateTimers()
+    n = store.size
+    xs = store.x[:n].tolist()
+    ys = store.y[:n].tolist()
+    return Frame(
+        tuple((vehicle.currentImage, xs[vehicle.slot], ys[vehicle.slot]) for vehicle in simulation),
+        scheduler.phase,
+        tuple((signal.red, signal.yellow, signal.green) for signal in signals),
+        tuple(vehicles[directionNumbers[i]]['crossed'] for i in range(0,noOfSignals)),
+        timeElapsed)
+
+# Start a run from an empty junction, keeping the profile and the settings
+def resetRun():
+    global tick, timeElapsed, noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws, phaseStart, crossedWait
+    signals[:] = []
+    simulation.empty()
+    resetLanes()
+    tick = 0
+    timeElapsed = 0
+    noOfCars = noOfBikes = noOfBuses = noOfTrucks = noOfRickshaws = 0
+    phaseStart = (0,0)
+    crossedWait = 0
+
+# Headless engine: the same ticks as the live simulation without a window or camera.
+# A run started from a snapshot() replays exactly as the original run went on; with
+# snapshotEvery the snapshots taken every that many simulated seconds are returned.
+def runHeadless(duration=simTime, seed=None, state=None, snapshotEvery=0):
+    if(strategy=='camera'):
+        configure(strategyName='lanes')     # no camera without a window, count the simulated lanes
+    clock = SimulatedClock()
+    if state is None:
+        resetRun()
+        scheduleArrivals(duration, seed)
+        initialize(clock)
+    else:
+        restore(state, clock)
+    snapshots = []
+    while(timeElapsed<duration):
+        step(clock)
+        if(snapshotEvery and tick%ticksPerSecond==0 and timeElapsed%snapshotEvery==0):
+            snapshots.append((timeElapsed, snapshot()))
+    return snapshots
+
+
+# The window runs the same ticks as runHeadless(), as many per frame as the wall clock
+# asks for, and draws the Frame left by the last of them
+def Main(speed=1):
+    clock = SimulatedClock()
+    if arrivals is None:
+        scheduleArrivals(simTime)
+    initialize(clock, printStatus)
+    if(strategy=='camera'):
+        startDetection()    # YOLO loads while the window opens, not at the first detection
 
     # Colours 
     black = (0, 0, 0)
     white = (255, 255, 255)
 
     # Screensize 
-    screenWidth = 1400
-    screenHeight = 800
     screenSize = (screenWidth, screenHeight)
 
     # Setting background image i.e. image of intersection
-    background = pygame.image.load('first.png')
-
     screen = pygame.display.set_mode(screenSize)
+    intersection = pygame.image.load(background).convert()
     pygame.display.set_caption("SIMULATION")
+    convertImages()
+    preload(directionNumbers.values(), vehicleTypes.values(), rotationAngle)
 
     # Loading signal images and font
     redSignal = pygame.image.load('images/signals/red.png')
@@ -464,59 +696,158 @@ class Main:
     greenSignal = pygame.image.load('images/signals/green.png')
     font = pygame.font.Font(None, 30)
 
-    thread3 = threading.Thread(name="generateVehicles",target=generateVehicles, args=())    # Generating vehicles
-    thread3.daemon = True
-    thread3.start()
+    # Text surfaces are rendered again only when the value shown changes
+    signalTexts = [CachedText(font, white, black, signalTimerCoods[i]) for i in range(0,noOfSignals)]
+    countTexts = [CachedText(font, black, white, vehicleCountCoods[i]) for i in range(0,noOfSignals)]
+    timeElapsedText = CachedText(font, black, white, (1100,50))
+    speedText = CachedText(font, black, white, (1100,80))
+    # stage timings, shown while the profiler is on and refreshed every overlayFrames frames
+    overlayFont = pygame.font.Font(None, 22)
+    overlayTexts = [CachedText(overlayFont, black, white, (1000, 560+20*i)) for i in range(0,11)]
+    overlayFrames = 30
+    frames = 0
+    renderer = Renderer(screen, intersection)
+    frameClock = pygame.time.Clock()
+    wallClock = WallClock(secondLength, speed)
 
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                closeMetrics()
+                dumpTimings()
+                stopDetection()
                 sys.exit()
-
-        screen.blit(background,(0,0))   # display background in simulation
-        for i in range(0,noOfSignals):  # display signal and set timer according to current status: green, yello, or red
-            if(i==currentGreen):
-                if(currentYellow==1):
-                    if(signals[i].yellow==0):
-                        signals[i].signalText = "STOP"
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                profiler.enabled = not profiler.enabled
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_UP, pygame.K_DOWN):
+                faster = [s for s in speedSteps if s>wallClock.speed]
+                slower = [s for s in speedSteps if s<wallClock.speed]
+                if event.key == pygame.K_UP and faster:
+                    wallClock.setSpeed(faster[0])
+                elif event.key == pygame.K_DOWN and slower:
+                    wallClock.setSpeed(slower[-1])
+
+        # every tick due by now is run, only the last state is drawn
+        deadline = time.monotonic() + maxFrameTime
+        with profiler.stage('ticks'):
+            while(tick < wallClock.time()*ticksPerSecond):
+                step(clock)
+                if(timeElapsed>=simTime):
+                    printSummary()
+                    closeMetrics()
+                    dumpTimings()
+                    stopDetection()
+                    sys.exit()
+                if(time.monotonic()>deadline):
+                    wallClock.resync(tick/float(ticksPerSecond))    # too fast for this machine, keep the window responsive
+                    break
+        with profiler.stage('frame'):
+            frame = frameState()
+
+        with profiler.stage('clear'):
+            renderer.clearVehicles()    # background over the vehicles of the last frame only
+        with profiler.stage('signals and text'):
+            currentGreen, currentYellow = frame.phase
+            for i in range(0,noOfSignals):  # display signal and set timer according to current status: green, yello, or red
+                red, yellow, green = frame.signals[i]
+                if(i==currentGreen):
+                    if(currentYellow==1):
+                        if(yellow==0):
+                            signalText = "STOP"
+                        else:
+                            signalText = yellow
+                        renderer.drawImage(i, yellowSignal, signalCoods[i])
                     else:
-                        signals[i].signalText = signals[i].yellow
-                    screen.blit(yellowSignal, signalCoods[i])
+                        if(green==0):
+                            signalText = "SLOW"
+                        else:
+                            signalText = green
+                        renderer.drawImage(i, greenSignal, signalCoods[i])
                 else:
-                    if(signals[i].green==0):
-                        signals[i].signalText = "SLOW"
-                    else:
-                        signals[i].signalText = signals[i].green
-                    screen.blit(greenSignal, signalCoods[i])
-            else:
-                if(signals[i].red<=10):
-                    if(signals[i].red==0):
-                        signals[i].signalText = "GO"
+                    if(red<=10):
+                        if(red==0):
+                            signalText = "GO"
+                        else:
+                            signalText = red
                     else:
-                        signals[i].signalText = signals[i].red
-                else:
-                    signals[i].signalText = "---"
-                screen.blit(redSignal, signalCoods[i])
-        signalTexts = ["","","",""]
-
-        # display signal timer and vehicle count
-        for i in range(0,noOfSignals):  
-            signalTexts[i] = font.render(str(signals[i].signalText), True, white, black)
-            screen.blit(signalTexts[i],signalTimerCoods[i]) 
-            displayText = vehicles[directionNumbers[i]]['crossed']
-            vehicleCountTexts[i] = font.render(str(displayText), True, black, white)
-            screen.blit(vehicleCountTexts[i],vehicleCountCoods[i])
-
-        timeElapsedText = font.render(("Time Elapsed: "+str(timeElapsed)), True, black, white)
-        screen.blit(timeElapsedText,(1100,50))
+                        signalText = "---"
+                    renderer.drawImage(i, redSignal, signalCoods[i])
+                # display signal timer and vehicle count
+                renderer.drawText(signalTexts[i], signalText)
+                renderer.drawText(countTexts[i], frame.crossed[i])
+            renderer.drawText(timeElapsedText, "Time Elapsed: "+str(frame.timeElapsed))
+            renderer.drawText(speedText, "Speed: "+str(wallClock.speed)+"x")
+
+        if(frames%overlayFrames==0):
+            lines = []
+            if profiler.enabled:
+                lines = ["%-16s p50 %7.3f  p95 %7.3f  p99 %7.3f ms" % (name, p50, p95, p99)
+                         for name, count, p50, p95, p99 in profiler.summary()]
+            for i in range(0,len(overlayTexts)):
+                renderer.drawText(overlayTexts[i], lines[i] if i<len(lines) else "")
+        else:
+            for text in overlayTexts:
+                renderer.drawText(text, text.value)
+        frames += 1
 
         # display the vehicles
-        for vehicle in simulation:  
-            screen.blit(vehicle.currentImage, [vehicle.x, vehicle.y])
-            # vehicle.render(screen)
-            vehicle.move()
-        pygame.display.update()
-
-Main()
+        with profiler.stage('vehicles'):
+            renderer.drawVehicles(frame.vehicles)
+        with profiler.stage('display'):
+            renderer.update()   # push only the changed areas to the window
+        frameClock.tick(min(ticksPerSecond*wallClock.speed/secondLength, maxFrameRate))   # no point drawing faster than the model ticks
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Traffic signal simulation')
+    parser.add_argument('--headless', action='store_true', help='run on a simulated clock without window or camera')
+    # no defaults here, to tell the flags given from the ones a restored snapshot replaces
+    parser.add_argument('--profile', default=None, choices=sorted(profiles), help='intersection geometry, first by default')
+    parser.add_argument('--strategy', default=None, choices=sorted(strategies), help='how green times are decided, camera by default')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the vehicle generator')
+    parser.add_argument('--duration', type=int, default=simTime, help='simulated seconds of a headless run')
+    parser.add_argument('--snapshot-every', type=int, default=0, help='save a snapshot every that many simulated seconds')
+    parser.add_argument('--snapshots', default='snapshots', help='folder of the saved snapshots')
+    parser.add_argument('--restore', default=None, help='continue a headless run from a saved snapshot')
+    parser.add_argument('--metrics', default=None, help='folder to record per-vehicle and per-phase metrics to')
+    parser.add_argument('--metrics-format', default='csv', choices=['csv', 'parquet'], help='file format of the metrics chunks')
+    parser.add_argument('--demand', default=demand, choices=demands, help='arrival pattern of the vehicles')
+    parser.add_argument('--start-hour', type=int, default=startHour, help='hour of the day the hourly demand starts at')
+    parser.add_argument('--hour-length', type=float, default=hourLength, help='simulated seconds per hour of the hourly demand')
+    parser.add_argument('--timings', default=None, help='time the stages of the loop and write their percentiles to this CSV file on exit')
+    parser.add_argument('--speed', type=float, default=1, help='playback speed of the window, from %s to %s' % (speedSteps[0], speedSteps[-1]))
+    args = parser.parse_args()
+    if args.duration <= 0:
+        parser.error('--duration must be a positive number of seconds')
+
+    configure(args.profile, args.strategy)
+    demand = args.demand
+    startHour = args.start_hour
+    hourLength = args.hour_length
+    if args.metrics:
+        enableMetrics(args.metrics, args.metrics_format)
+    if args.timings:
+        profiler.enabled = True
+        timingsFile = args.timings
+    if(args.headless):
+        state = None
+        if args.restore:
+            with open(args.restore, 'rb') as f:
+                state = f.read()
+            saved = pickle.loads(zlib.decompress(state))
+            for flag, given in [('profile', args.profile), ('strategy', args.strategy)]:
+                if given is not None and given!=saved[flag]:
+                    print('Warning: the snapshot was taken with --'+flag, saved[flag]+', ignoring --'+flag, given)
+        snapshots = runHeadless(args.duration, args.seed, state, args.snapshot_every)
+        if snapshots:
+            os.makedirs(args.snapshots, exist_ok=True)
+        for second, data in snapshots:
+            with open(os.path.join(args.snapshots, 'second_'+str(second)+'.snap'), 'wb') as f:
+                f.write(data)
+        closeMetrics()
+        dumpTimings()
+        printSummary()
+    else:
+        scheduleArrivals(simTime, args.seed)
+        Main(max(speedSteps[0], min(args.speed, speedSteps[-1])))
 
   
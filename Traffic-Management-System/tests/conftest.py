@@ -0,0 +1,9 @@
+# The tests import the modules of this folder and load images/ relative to it, as the
+# scripts do when started from here, and never open a window
+import os
+import sys
+
+folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, folder)
+os.chdir(folder)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
@@ -0,0 +1,45 @@
+import pickle
+import numpy as np
+import pytest
+from arrivals import ArrivalSchedule, buildSchedule, restoreSchedule, demands
+
+def makeSchedule(times):
+    count = len(times)
+    return ArrivalSchedule(np.array(times, dtype=float), np.zeros(count, dtype=int), np.ones(count, dtype=int),
+                           np.zeros(count, dtype=int), np.zeros(count, dtype=bool))
+
+def test_due_hands_out_every_arrival_once():
+    schedule = makeSchedule([0, 0.5, 0.5, 1.25, 3])
+    assert list(schedule.due(0))==[0]
+    assert list(schedule.due(0.25))==[]
+    assert list(schedule.due(0.5))==[1, 2]
+    assert list(schedule.due(2))==[3]
+    assert list(schedule.due(10))==[4]
+    assert list(schedule.due(20))==[]
+
+def test_due_never_goes_back():
+    schedule = makeSchedule([0, 1, 2])
+    assert list(schedule.due(1.5))==[0, 1]
+    assert list(schedule.due(0.5))==[]
+    assert list(schedule.due(2))==[2]
+
+@pytest.mark.parametrize('demand', demands)
+def test_schedules_are_seeded(demand):
+    first = buildSchedule(300, 0.25, demand, seed=3)
+    second = buildSchedule(300, 0.25, demand, seed=3)
+    assert pickle.dumps(first.snapshot())==pickle.dumps(second.snapshot())
+    assert np.all(np.diff(first.times) >= 0)
+    assert np.all(first.lane[first.vehicleClass==4]==0)     # bikes keep to lane 0
+    assert not np.any(first.willTurn[first.lane!=2])
+
+def test_regular_demand_keeps_the_interval():
+    schedule = buildSchedule(10, 0.25, 'regular', seed=1)
+    assert len(schedule)==40
+    assert np.allclose(np.diff(schedule.times), 0.25)
+
+def test_restore_pickles_identically():
+    schedule = buildSchedule(60, 0.25, 'poisson', seed=5)
+    schedule.due(30)
+    copy = restoreSchedule(pickle.loads(pickle.dumps(schedule.snapshot())))
+    assert pickle.dumps(copy.snapshot())==pickle.dumps(schedule.snapshot())
+    assert list(copy.due(40))==list(schedule.due(40))
@@ -0,0 +1,35 @@
+import assets
+import pytest
+import simulation
+
+@pytest.fixture
+def emptyCache(monkeypatch):
+    monkeypatch.setattr(assets, 'vehicleImages', {})
+    monkeypatch.setattr(assets, 'rotatedImages', {})
+    monkeypatch.setattr(assets, 'hits', 0)
+    monkeypatch.setattr(assets, 'misses', 0)
+
+def test_an_image_is_loaded_once_then_reused(emptyCache):
+    first = assets.vehicleImage('right', 'car')
+    assert assets.vehicleImage('right', 'car') is first
+    assets.vehicleImage('up', 'bus')
+    assert assets.cacheStats()=={'hits': 1, 'misses': 2, 'images': 2, 'rotations': 0}
+
+def test_a_turn_frame_is_rotated_once(emptyCache):
+    first = assets.rotatedImage('down', 'truck', 30)
+    assert assets.rotatedImage('down', 'truck', 30) is first
+    assert assets.cacheStats()['rotations']==1
+    assert assets.cacheStats()['misses']==1
+
+def test_spawning_after_preload_never_loads_an_image(emptyCache):
+    assets.preload(simulation.directionNumbers.values(), simulation.vehicleTypes.values(), simulation.rotationAngle)
+    loaded = assets.cacheStats()
+    simulation.configure('first', 'lanes')
+    try:
+        simulation.runHeadless(60, seed=2)
+    finally:
+        simulation.configure('first', 'camera')
+    stats = assets.cacheStats()
+    assert stats['misses']==loaded['misses']
+    assert stats['rotations']==loaded['rotations']
+    assert stats['hits']>loaded['hits']
@@ -0,0 +1,25 @@
+from benchmark import compare
+
+baseline = {'100': {'ticksPerSecond': 1000.0, 'usPerVehicleUpdate': 10.0, 'renderMsPerFrame': 2.0, 'peakRssMb': 80.0}}
+
+def rows(result, tolerance=0.2):
+    return {row[1]: row for row in compare({100: result}, baseline, tolerance)}
+
+def test_within_tolerance_is_no_regression():
+    result = {'ticksPerSecond': 850.0, 'usPerVehicleUpdate': 11.5, 'renderMsPerFrame': 2.0, 'peakRssMb': 90.0}
+    assert not any(row[5] for row in rows(result).values())
+
+def test_slower_beyond_tolerance_regresses():
+    result = {'ticksPerSecond': 700.0, 'usPerVehicleUpdate': 13.0, 'renderMsPerFrame': 1.0, 'peakRssMb': 80.0}
+    found = rows(result)
+    assert found['ticksPerSecond'][5]
+    assert found['usPerVehicleUpdate'][5]
+    assert not found['renderMsPerFrame'][5]     # faster is never a regression
+    assert found['ticksPerSecond'][4]==0.7
+
+def test_metrics_missing_on_either_side_are_not_compared():
+    result = {'ticksPerSecond': 100.0, 'usPerVehicleUpdate': 10.0, 'renderMsPerFrame': None, 'peakRssMb': None}
+    assert rows(result)['renderMsPerFrame'][4] is None
+    unknown = compare({1000: result}, baseline, 0.2)   # population without a baseline
+    assert not any(row[5] for row in unknown)
+    assert all(row[3] is None for row in unknown)
@@ -0,0 +1,13 @@
+from calibrate import paretoFront
+
+def row(candidate, throughput, wait):
+    return {'candidate': candidate, 'throughput': throughput, 'wait': wait}
+
+def test_front_keeps_the_settings_no_other_beats_on_both_measures():
+    rows = [row(0, 1.0, 10), row(1, 1.2, 12), row(2, 0.9, 11), row(3, 1.2, 14), row(4, 0.8, 8)]
+    # 2 has less throughput and more wait than 0, 3 the same throughput as 1 with more wait
+    assert [found['candidate'] for found in paretoFront(rows)]==[1, 0, 4]
+
+def test_equal_rows_do_not_dominate_each_other():
+    rows = [row(0, 1.0, 10), row(1, 1.0, 10)]
+    assert len(paretoFront(rows))==2
@@ -0,0 +1,29 @@
+import pytest
+import corridor
+from corridor import Corridor, greenWaveOffsets, linkLength
+from simulation import screenWidth
+
+def test_offsets_follow_the_travel_time_between_stop_lines():
+    offsets = greenWaveOffsets(5, 80, 100.0)
+    travel = (screenWidth + linkLength)/100.0
+    assert offsets[0]==0
+    for before, after in zip(offsets, offsets[1:]):
+        assert (after - before)%80==pytest.approx(travel%80)
+    assert all(0<=offset<80 for offset in offsets)
+
+def test_every_vehicle_is_on_a_junction_a_link_or_gone():
+    network = Corridor(3, seed=1)
+    network.run(60)
+    alive = int(network.store.alive[:network.store.size].sum())
+    assert network.entered==network.exited + len(network.links) + alive
+
+def test_green_wave_shortens_eastbound_trips():
+    trips = {}
+    for greenWave in (True, False):
+        network = Corridor(3, seed=1, greenWave=greenWave)
+        network.run(120)
+        trips[greenWave] = network.trips[1]
+        assert trips[greenWave]
+        # the whole corridor is at least two links long
+        assert min(trips[greenWave]) > 2*linkLength/(max(corridor.speeds.values())*corridor.ticksPerSecond)
+    assert sum(trips[True])/len(trips[True]) < sum(trips[False])/len(trips[False])
@@ -0,0 +1,66 @@
+import threading
+from detection_service import DetectionService
+
+def blockingService(maxPending=2):
+    release = threading.Event()
+    def detect(key):
+        release.wait(5)
+        return key*10
+    return DetectionService(detect, workers=1, maxPending=maxPending), release
+
+# Wait for the workers, and with them the callbacks that keep the last results
+def finish(service):
+    service.executor.shutdown(wait=True)
+
+def test_requests_beyond_max_pending_are_refused():
+    service, release = blockingService(maxPending=2)
+    first = service.submit(1)
+    second = service.submit(2)
+    assert service.submit(3) is None
+    assert service.refused==1
+    release.set()
+    assert first.result(5)==10 and second.result(5)==20
+    finish(service)
+
+def test_slots_free_up_as_requests_finish():
+    service, release = blockingService(maxPending=1)
+    release.set()
+    service.submit(1).result(5)
+    future = service.submit(2)
+    assert future is not None
+    assert future.result(5)==20
+    assert service.refused==0
+    finish(service)
+
+def test_last_result_is_kept_per_key():
+    service, release = blockingService()
+    assert service.last(1) is None
+    release.set()
+    service.submit(1).result(5)
+    service.submit(2).result(5)
+    finish(service)
+    assert (service.last(1), service.last(2)) == (10, 20)
+
+def test_late_result_still_updates_the_last_one():
+    service, release = blockingService()
+    future = service.submit(1)
+    assert not future.done()    # past its deadline, the caller falls back to last()
+    release.set()
+    future.result(5)
+    finish(service)
+    assert service.last(1)==10
+
+def test_failures_are_reported_once_and_keep_the_last_result(capsys):
+    results = iter([5, RuntimeError('camera gone')])
+    def detect(key):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    service = DetectionService(detect)
+    service.submit(1).result(5)
+    failed = service.submit(1)
+    failed.exception(5)
+    finish(service)
+    assert service.last(1)==5
+    assert capsys.readouterr().out.count('Detection failed')==1
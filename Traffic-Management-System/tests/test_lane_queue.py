@@ -0,0 +1,72 @@
+from lane_queue import LaneQueue
+from vehicle_store import VehicleStore, StoredVehicle
+
+width = 40
+height = 20
+gap = 15
+
+class Car(StoredVehicle):
+    vehicleClass = 'car'
+
+def makeLane(directionNumber=0):
+    store = VehicleStore([590, 330, 800, 535], [700, 430, 700, 430], 15, 3)
+    start = {0: (0, 350), 1: (700, 0), 2: (1400, 450), 3: (600, 800)}[directionNumber]
+    stop = {0: 580, 1: 320, 2: 810, 3: 545}[directionNumber]
+    return store, LaneQueue(directionNumber, 1, start[0], start[1], stop, gap)
+
+def spawn(store, lane):
+    car = Car()
+    car.store = store
+    lane.spawn(car, store, width, height, 2, 0)
+    return car
+
+def test_first_vehicle_starts_at_the_lane_start():
+    store, lane = makeLane()
+    car = spawn(store, lane)
+    assert (car.x, car.y, car.stop) == (0, 350, 580)
+    assert store.leader[car.slot]==-1
+    assert lane.head is car and lane.tail is car
+
+def test_vehicles_line_up_behind_the_tail():
+    store, lane = makeLane()
+    first = spawn(store, lane)
+    second = spawn(store, lane)
+    assert second.x==first.x - gap - width
+    assert second.stop==first.stop - (width + gap)
+    assert store.leader[second.slot]==first.slot
+    assert second.leader is first and first.follower is second
+    assert [car.index for car in lane]==[0, 1]
+
+def test_vehicles_line_up_against_the_direction_of_travel():
+    store, lane = makeLane(2)
+    first = spawn(store, lane)
+    second = spawn(store, lane)
+    assert second.x==first.x + width + gap
+    assert second.stop==first.stop + width + gap
+
+def test_stop_is_the_default_once_the_tail_has_crossed():
+    store, lane = makeLane()
+    first = spawn(store, lane)
+    store.crossed[first.slot] = True
+    store.x[first.slot] = 700
+    second = spawn(store, lane)
+    assert (second.x, second.stop) == (0, 580)
+
+def test_waiting_counts():
+    store, lane = makeLane()
+    cars = [spawn(store, lane) for i in range(3)]
+    assert (len(lane), lane.waiting, lane.waitingCounts) == (3, 3, {'car': 3})
+    lane.markCrossed(cars[0])
+    assert (len(lane), lane.waiting, lane.waitingCounts) == (3, 2, {'car': 2})
+
+def test_remove_relinks_the_lane():
+    store, lane = makeLane()
+    first, second, third = [spawn(store, lane) for i in range(3)]
+    lane.remove(second)
+    assert list(lane)==[first, third]
+    assert third.leader is first and first.follower is third
+    lane.remove(first)
+    assert lane.head is third and third.leader is None
+    lane.remove(third)
+    assert lane.head is None and lane.tail is None and len(lane)==0
+    assert spawn(store, lane).index==3     # spawn order is never renumbered
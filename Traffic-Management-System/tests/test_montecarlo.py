@@ -0,0 +1,23 @@
+import math
+import pytest
+import simulation
+from montecarlo import runOnce, summarize
+
+def test_summary_per_variant():
+    results = [{'variant': 'Static', 'total': total, 'wait': wait} for total, wait in [(10, 4.0), (14, 6.0)]]
+    results.append({'variant': 'Dynamic', 'total': 20, 'wait': 3.0})
+    static, dynamic = summarize(results, ['Static', 'Dynamic', 'Unused'])
+    assert static['runs']==2 and static['mean']==12 and static['wait']==5.0
+    assert static['stdev']==pytest.approx(math.sqrt(8))
+    assert static['ciLow']==pytest.approx(12-1.96*2) and static['ciHigh']==pytest.approx(12+1.96*2)
+    assert dynamic['stdev']==0.0 and dynamic['ciLow']==dynamic['ciHigh']==20
+
+def test_run_uses_the_hourly_demand_of_the_task(monkeypatch):
+    for name in ['demand', 'startHour', 'hourLength']:
+        monkeypatch.setattr(simulation, name, getattr(simulation, name))    # put back afterwards
+    try:
+        result = runOnce(('Dynamic', 'lanes', 1, 30, 'hourly', 3, 10, 'first'))
+        assert (simulation.demand, simulation.startHour, simulation.hourLength)==('hourly', 3, 10)
+        assert result['total']==sum(result['lanes'])
+    finally:
+        simulation.configure('first', 'camera')
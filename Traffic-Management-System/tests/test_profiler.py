@@ -0,0 +1,35 @@
+import csv
+import pytest
+from profiler import Profiler
+
+def test_percentiles_of_the_recorded_stage():
+    profiler = Profiler()
+    for ms in range(1, 101):
+        profiler.record('move', ms/1e3)
+    [(name, count, p50, p95, p99)] = profiler.summary()
+    assert (name, count)==('move', 100)
+    assert p50==pytest.approx(50.5)
+    assert p95==pytest.approx(95.05)
+    assert p99==pytest.approx(99.01)
+
+def test_only_the_newest_window_counts():
+    profiler = Profiler(window=10)
+    for ms in [100]*10 + [1]*10:
+        profiler.record('frame', ms/1e3)
+    [(name, count, p50, p95, p99)] = profiler.summary()
+    assert count==10
+    assert p99==pytest.approx(1)
+
+def test_stages_are_timed_only_when_enabled(tmp_path):
+    profiler = Profiler()
+    with profiler.stage('idle'):
+        pass
+    assert profiler.summary()==[]
+    profiler.enabled = True
+    with profiler.stage('ticks'):
+        pass
+    profiler.dump(str(tmp_path/'timings.csv'))
+    with open(str(tmp_path/'timings.csv'), newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0]==['Stage', 'Samples', 'p50 ms', 'p95 ms', 'p99 ms']
+    assert [row[:2] for row in rows[1:]]==[['ticks', '1']]
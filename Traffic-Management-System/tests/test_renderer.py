@@ -0,0 +1,61 @@
+import pygame
+import pytest
+from renderer import Renderer, CachedText
+
+@pytest.fixture
+def pushed(monkeypatch):
+    updates = []
+    monkeypatch.setattr(pygame.display, 'update', lambda rects: updates.append(list(rects)))
+    return updates
+
+def makeRenderer():
+    screen = pygame.Surface((200, 100))
+    background = pygame.Surface((200, 100))
+    background.fill((0, 0, 255))
+    return screen, Renderer(screen, background)
+
+def vehicle():
+    image = pygame.Surface((10, 10))
+    image.fill((255, 0, 0))
+    return image
+
+def test_first_frame_goes_out_in_full_then_only_the_vehicles(pushed):
+    screen, renderer = makeRenderer()
+    car = vehicle()
+    renderer.drawVehicles([(car, 20, 20)])
+    renderer.update()
+    assert pushed[0][0]==screen.get_rect()
+    renderer.clearVehicles()
+    renderer.drawVehicles([(car, 22, 20), (car, 500, 20)])     # the second is off the window
+    renderer.update()
+    assert pushed[1]==[pygame.Rect(20, 20, 10, 10), pygame.Rect(22, 20, 10, 10)]
+    # the background is back where the car was and the car is drawn where it is now
+    assert screen.get_at((20, 25))==(0, 0, 255, 255)
+    assert screen.get_at((22, 25))==(255, 0, 0, 255)
+
+def test_overlays_are_sent_only_when_they_change(pushed):
+    screen, renderer = makeRenderer()
+    renderer.update()
+    red, green = vehicle(), vehicle()
+    renderer.drawImage('signal', red, (100, 50))
+    renderer.update()
+    renderer.drawImage('signal', red, (100, 50))
+    renderer.update()
+    renderer.drawImage('signal', green, (100, 50))
+    renderer.update()
+    assert pushed[1:]==[[pygame.Rect(100, 50, 10, 10)], [], [pygame.Rect(100, 50, 10, 10)]]
+
+def test_text_is_rendered_again_only_for_a_new_value(pushed):
+    pygame.font.init()
+    screen, renderer = makeRenderer()
+    renderer.update()
+    text = CachedText(pygame.font.Font(None, 20), (255, 255, 255), (0, 0, 0), (5, 5))
+    renderer.drawText(text, 8)
+    surface = text.surface
+    renderer.drawText(text, 8)
+    assert text.surface is surface
+    renderer.update()
+    renderer.drawText(text, 1000)
+    renderer.update()
+    assert pushed[1]==[surface.get_rect(topleft=(5, 5))]
+    assert pushed[2]==[text.rect.union(surface.get_rect(topleft=(5, 5)))]
@@ -0,0 +1,125 @@
+import pytest
+import signal_scheduler
+from signal_scheduler import SignalScheduler, SimulatedClock, WallClock
+
+defaultRed = 150
+defaultYellow = 5
+defaultGreen = 20
+detectionTime = 5
+
+class Signal:
+    def __init__(self):
+        self.red = defaultRed
+        self.yellow = defaultYellow
+        self.green = defaultGreen
+        self.totalGreenTime = 0
+
+# Scheduler of four signals that records (time, signal) of every green
+def makeScheduler(**callbacks):
+    clock = SimulatedClock()
+    greens = []
+    signals = [Signal() for i in range(4)]
+    scheduler = SignalScheduler(signals, clock, detectionTime, defaultRed, defaultYellow, defaultGreen,
+                                onGreen=lambda signal: greens.append((clock.now, signal)), **callbacks)
+    return scheduler, clock, greens
+
+def runTo(scheduler, clock, end):
+    while clock.now<end:
+        clock.advance(1)
+        scheduler.runUntil(clock.now)
+
+def test_signals_turn_green_in_order():
+    scheduler, clock, greens = makeScheduler()
+    scheduler.start()
+    runTo(scheduler, clock, 100)
+    assert greens==[(0, 0), (25, 1), (50, 2), (75, 3), (100, 0)]
+    assert scheduler.signals[0].totalGreenTime==defaultGreen
+
+def test_phase_goes_yellow_before_the_next_green():
+    scheduler, clock, greens = makeScheduler()
+    scheduler.start()
+    runTo(scheduler, clock, 19)
+    assert scheduler.phase==(0, 0)
+    runTo(scheduler, clock, 20)
+    assert scheduler.phase==(0, 1)
+    runTo(scheduler, clock, 25)
+    assert scheduler.phase==(1, 0)
+
+def test_detection_sets_the_next_green_time():
+    detections = []
+    def detect(signal):
+        detections.append((clock.now, signal))
+        scheduler.signals[signal].green = 10
+    scheduler, clock, greens = makeScheduler(onDetect=detect)
+    scheduler.start()
+    runTo(scheduler, clock, 45)
+    assert detections==[(20, 1), (35, 2)]
+    assert greens==[(0, 0), (25, 1), (40, 2)]
+
+def test_restore_carries_on_the_same_cycle():
+    scheduler, clock, greens = makeScheduler()
+    scheduler.start()
+    runTo(scheduler, clock, 33)
+    state = scheduler.snapshot()
+    copy, copyClock, copyGreens = makeScheduler()
+    copy.restore(state)
+    copyClock.now = clock.now
+    runTo(scheduler, clock, 120)
+    runTo(copy, copyClock, 120)
+    assert copyGreens==greens[2:]
+
+def test_set_next_skips_signals():
+    scheduler, clock, greens = makeScheduler(onDetect=lambda signal: scheduler.setNext(3) if signal==1 else None)
+    scheduler.start()
+    runTo(scheduler, clock, 20)
+    assert scheduler.signals[1].red==defaultRed
+    assert scheduler.signals[3].red==5
+    runTo(scheduler, clock, 50)
+    assert greens==[(0, 0), (25, 3), (50, 0)]
+
+def test_extension_delays_the_yellow():
+    extensions = []
+    def extend(signal):
+        extensions.append((clock.now, signal))
+        return 5 if len(extensions)==1 else 0
+    scheduler, clock, greens = makeScheduler(onExtend=extend)
+    scheduler.start()
+    runTo(scheduler, clock, 30)
+    assert extensions==[(20, 0), (25, 0)]
+    assert greens==[(0, 0), (30, 1)]
+    assert scheduler.signals[0].totalGreenTime==defaultGreen + 5
+
+# Wall time the WallClock reads, moved by hand
+class Monotonic:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def wall(monkeypatch):
+    wall = Monotonic()
+    monkeypatch.setattr(signal_scheduler, 'time', wall)
+    return wall
+
+def test_wall_clock_keeps_the_elapsed_time_across_speed_changes(wall):
+    clock = WallClock(secondLength=0.5, speed=1)
+    wall.now += 1
+    assert clock.time()==2
+    clock.setSpeed(10)
+    assert clock.time()==2
+    wall.now += 1
+    assert clock.time()==22
+    clock.setSpeed(0.5)
+    wall.now += 2
+    assert clock.time()==24
+
+def test_wall_clock_resync_carries_on_from_the_given_time(wall):
+    clock = WallClock(speed=2)
+    wall.now += 5
+    assert clock.time()==10
+    clock.resync(7)     # only 7 seconds were simulated in time
+    assert clock.time()==7
+    wall.now += 1
+    assert clock.time()==9
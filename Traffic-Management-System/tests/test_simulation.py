@@ -0,0 +1,128 @@
+import csv
+import math
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+import simulation
+from detection_service import DetectionService
+from signal_scheduler import SimulatedClock
+from vehicle_store import VehicleStore, numba
+
+@pytest.fixture(autouse=True)
+def firstProfile():
+    simulation.configure('first', 'lanes')
+    yield
+    simulation.configure('first', 'camera')
+
+def crossed():
+    return [simulation.vehicles[simulation.directionNumbers[i]]['crossed'] for i in range(simulation.noOfSignals)]
+
+def test_runs_in_one_process_start_from_scratch():
+    first = simulation.runHeadless(60, seed=1, snapshotEvery=60)
+    total = crossed()
+    second = simulation.runHeadless(60, seed=1, snapshotEvery=60)
+    assert second==first
+    assert crossed()==total
+    assert len(simulation.signals)==simulation.noOfSignals
+
+def test_restored_run_replays_byte_identically():
+    snapshots = dict(simulation.runHeadless(60, seed=3, snapshotEvery=20))
+    total = crossed()
+    replayed = dict(simulation.runHeadless(60, state=snapshots[20], snapshotEvery=20))
+    assert replayed[40]==snapshots[40]
+    assert replayed[60]==snapshots[60]
+    assert crossed()==total
+
+def test_metrics_include_the_vehicles_still_waiting(tmp_path):
+    simulation.enableMetrics(str(tmp_path))
+    simulation.runHeadless(60, seed=4)
+    waiting = sum(lane.waiting for direction in simulation.vehicles.values() for key, lane in direction.items() if key!='crossed')
+    simulation.closeMetrics()
+    with open(str(tmp_path/'vehicles_00000.csv'), newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert sum(1 for row in rows if math.isnan(float(row['crossed'])))==waiting
+    assert sum(1 for row in rows if not math.isnan(float(row['crossed'])))==sum(crossed())
+
+@pytest.mark.parametrize('strategy', ['fixed', 'actuated', 'maxpressure'])
+def test_every_strategy_moves_traffic(strategy):
+    simulation.configure(strategyName=strategy)
+    simulation.runHeadless(60, seed=2)
+    assert sum(crossed())>0
+
+counts = {'car': 12, 'bus': 1, 'truck': 0, 'rickshaw': 2, 'bike': 3}
+
+# Camera strategy on a simulated clock with cameraCounts() replaced by one that waits for release
+@pytest.mark.skipif(numba is None, reason='numba is not installed')
+@pytest.mark.parametrize('strategy', ['lanes', 'maxpressure'])
+def test_compiled_move_runs_as_the_numpy_one(strategy, monkeypatch):
+    simulation.configure(strategyName=strategy)
+    monkeypatch.setattr(VehicleStore, 'compiled', True)
+    compiled = simulation.runHeadless(120, seed=5, snapshotEvery=60)
+    monkeypatch.setattr(VehicleStore, 'compiled', False)
+    assert simulation.runHeadless(120, seed=5, snapshotEvery=60)==compiled
+
+@pytest.fixture
+def camera(monkeypatch):
+    release = threading.Event()
+    def cameraCounts():
+        release.wait(5)
+        return dict(counts), None
+    monkeypatch.setattr(simulation, 'cameraCounts', cameraCounts)
+    monkeypatch.setattr(simulation, 'spawnFromCamera', lambda signalNumber, counts: None)
+    monkeypatch.setattr(simulation.cv2, 'imshow', lambda *args: None)
+    monkeypatch.setattr(simulation.cv2, 'waitKey', lambda *args: None)
+    monkeypatch.setattr(simulation, 'detection', DetectionService(simulation.detectSignal))
+    monkeypatch.setattr(simulation, 'pendingDetections', {})
+    simulation.configure(strategyName='camera')
+    simulation.resetRun()
+    simulation.scheduleArrivals(100, 1)
+    clock = SimulatedClock()
+    simulation.initialize(clock)
+    yield release, clock
+    release.set()
+    simulation.detection.shutdown()
+
+def runTo(clock, now, wait=0):
+    while clock.now<now:
+        simulation.step(clock)
+        time.sleep(wait)
+
+def test_detection_in_time_sets_the_green(camera):
+    release, clock = camera
+    release.set()
+    runTo(clock, 25, wait=0.001)
+    assert simulation.scheduler.phase==(1, 0)
+    assert simulation.scheduler.greenTime==simulation.formulaGreenTime(counts)
+
+def test_detection_past_its_deadline_falls_back_to_the_last_counts(camera):
+    release, clock = camera
+    missed = simulation.detectionsMissed
+    runTo(clock, 25)
+    assert simulation.scheduler.phase==(1, 0)
+    assert simulation.scheduler.greenTime==simulation.defaultGreen     # no counts yet
+    assert simulation.detectionsMissed==missed+1
+    # the late result is still kept, and used when the next request is late too
+    release.set()
+    for i in range(500):
+        if simulation.detection.last(1) is not None:
+            break
+        time.sleep(0.01)
+    release.clear()
+    simulation.requestDetection(1)
+    clock.now = simulation.scheduler.yellowEnd
+    simulation.applyDetections()
+    assert simulation.detectionsMissed==missed+2
+    assert simulation.signals[1].green==simulation.formulaGreenTime(counts)
+
+def test_refused_and_failed_detections_are_counted_apart_from_missed_ones(camera):
+    release, clock = camera
+    counters = simulation.detectionsMissed, simulation.detectionsRefused, simulation.detectionsFailed
+    failure = Future()
+    failure.set_exception(RuntimeError('no model'))
+    simulation.pendingDetections[2] = (None, 10)
+    simulation.pendingDetections[3] = (failure, 10)
+    simulation.applyDetections()
+    assert simulation.pendingDetections=={}
+    assert (simulation.detectionsMissed, simulation.detectionsRefused, simulation.detectionsFailed)==\
+        (counters[0], counters[1]+1, counters[2]+1)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import vehicle_detection
+from vehicle_detection import countDetections
+
+# Rows (x1, y1, x2, y2, confidence, class) of one frame, COCO class ids
+def detections(*rows):
+    return np.array([[0, 0, 10, 10, conf, classId] for conf, classId in rows], dtype=float).reshape(-1, 6)
+
+def test_counts_vehicle_classes_into_their_buckets():
+    rows = detections((0.9, 2), (0.8, 2), (0.7, 7), (0.6, 5), (0.5, 3), (0.5, 1), (0.9, 0), (0.9, 9))
+    assert countDetections(rows)=={'car': 2, 'truck': 1, 'bus': 1, 'bike': 2, 'rickshaw': 0}
+
+def test_skips_detections_below_the_confidence():
+    rows = detections((vehicle_detection.confidence-0.01, 2), (vehicle_detection.confidence, 2))
+    assert countDetections(rows)['car']==1
+
+def test_no_detections_count_nothing():
+    assert countDetections(detections())=={name: 0 for name in vehicle_detection.countNames}
+
+# Stands in for the YOLO model: frame i holds i cars, every call is recorded
+class Results:
+    def __init__(self, xyxy):
+        self.xyxy = xyxy
+
+class StubModel:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, frames, size):
+        self.calls.append((len(frames), size))
+        return Results([detections(*[(0.9, 2)]*int(frame[0, 0, 0])) for frame in frames])
+
+def frame(cars):
+    return np.full((36, 64, 3), cars, dtype=np.uint8)
+
+@pytest.fixture
+def model(monkeypatch):
+    model = StubModel()
+    monkeypatch.setattr(vehicle_detection, 'loadModel', lambda: model)
+    monkeypatch.setattr(vehicle_detection, 'frameGate', vehicle_detection.FrameGate())
+    return model
+
+def test_batches_frames_into_forward_passes(model):
+    counts = vehicle_detection.detect_vehicles_batch([frame(i) for i in range(10)], batchSize=4, size=320)
+    assert [count['car'] for count in counts]==list(range(10))
+    assert model.calls==[(4, 320), (4, 320), (2, 320)]
+
+def test_model_keeps_only_vehicle_classes_with_the_nms_settings(model):
+    vehicle_detection.detect_vehicles(frame(1))
+    assert model.conf==vehicle_detection.confidence
+    assert model.iou==vehicle_detection.iou
+    assert model.classes==[1, 2, 3, 5, 7]
+    assert model.agnostic==(not vehicle_detection.perClassNms)
+    assert model.calls==[(1, vehicle_detection.inputSize)]
+
+def test_unchanged_frame_of_a_source_reuses_its_counts(model):
+    first = vehicle_detection.detect_vehicles(frame(3), source='north')
+    assert vehicle_detection.detect_vehicles(frame(3), source='north')==first
+    assert len(model.calls)==1
+    vehicle_detection.detect_vehicles(frame(3), source='south')     # sources are gated apart
+    vehicle_detection.detect_vehicles(frame(40), source='north')    # changed
+    assert len(model.calls)==3
+    gate = vehicle_detection.frameGate
+    assert (gate.hits, gate.misses)==(1, 3)
+    assert gate.hitRate()==0.25
+
+def test_counts_are_reused_at_most_max_reuse_times(model, monkeypatch):
+    monkeypatch.setattr(vehicle_detection, 'maxReuse', 2)
+    for i in range(7):
+        vehicle_detection.detect_vehicles(frame(3), source='north')
+    assert len(model.calls)==3     # frames 0, 3 and 6 go through the model
+
+def test_threshold_zero_runs_every_frame(model, monkeypatch):
+    monkeypatch.setattr(vehicle_detection, 'changeThreshold', 0)
+    for i in range(3):
+        vehicle_detection.detect_vehicles(frame(3), source='north')
+    assert len(model.calls)==3
+    assert vehicle_detection.frameGate.hitRate()==0.0
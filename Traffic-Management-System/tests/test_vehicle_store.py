@@ -0,0 +1,166 @@
+import pickle
+import numpy as np
+import pytest
+from vehicle_store import VehicleStore, directionSigns, turnedSigns, stopFrames, numba
+
+# Right and down drive towards growing coordinates and stop at 100, left and up
+# towards shrinking ones and stop at 300. The middle of the junction is at 200.
+stopLines = [100, 100, 300, 300]
+mids = [200, 200, 200, 200]
+gap2 = 15
+rotationAngle = 3
+size = 20
+speed = 2
+directions = [0, 1, 2, 3]
+
+# Every test runs on the NumPy operations and, with numba installed, on the compiled pass
+@pytest.fixture(autouse=True, params=[False, True], ids=['numpy', 'compiled'])
+def compiled(request, monkeypatch):
+    if request.param and numba is None:
+        pytest.skip('numba is not installed')
+    monkeypatch.setattr(VehicleStore, 'compiled', request.param)
+
+def makeStore():
+    return VehicleStore(stopLines, mids, gap2, rotationAngle)
+
+# Add a vehicle whose edge facing the direction of travel is distance pixels before the
+# stop line, stopping stopBefore pixels before it
+def addVehicle(store, direction, distance, stopBefore=10, willTurn=False, leader=-1):
+    sign = directionSigns[direction]
+    front = stopLines[direction] - sign*distance
+    pos = front - size if sign>0 else front
+    x, y = (pos, 50) if direction%2==0 else (50, pos)
+    return store.add(None, direction, 1, x, y, size, size, speed, stopLines[direction] - sign*stopBefore, willTurn, leader)
+
+def along(store, slot):
+    return store.x[slot] if store.direction[slot]%2==0 else store.y[slot]
+
+def front(store, slot):
+    return along(store, slot) + (size if directionSigns[store.direction[slot]]>0 else 0)
+
+def rear(store, slot):
+    return along(store, slot) + (0 if directionSigns[store.direction[slot]]>0 else size)
+
+def red(direction):
+    return (direction+1)%4, 0
+
+@pytest.mark.parametrize('direction', directions)
+def test_stops_at_red(direction):
+    store = makeStore()
+    slot = addVehicle(store, direction, 40)
+    sign = directionSigns[direction]
+    for tick in range(100):
+        crossed, rotated = store.move(*red(direction))
+        assert len(crossed)==0
+    assert not store.crossed[slot]
+    assert sign*front(store, slot) <= sign*store.stop[slot] + speed
+    assert sign*front(store, slot) < sign*stopLines[direction]
+    assert store.waited[slot] >= stopFrames
+    assert store.stops[slot]==1
+
+@pytest.mark.parametrize('direction', directions)
+def test_crosses_stop_line_on_green(direction):
+    store = makeStore()
+    slot = addVehicle(store, direction, 40)
+    sign = directionSigns[direction]
+    crossings = []
+    for tick in range(60):
+        crossed, rotated = store.move(direction, 0)
+        crossings.extend(crossed.tolist())
+    assert crossings==[slot]
+    assert store.crossed[slot]
+    assert sign*front(store, slot) > sign*stopLines[direction]
+    assert store.waited[slot]==0
+
+@pytest.mark.parametrize('direction', directions)
+def test_yellow_stops_vehicles_before_the_line(direction):
+    store = makeStore()
+    slot = addVehicle(store, direction, 40)
+    for tick in range(60):
+        store.move(direction, 1)
+    assert not store.crossed[slot]
+
+@pytest.mark.parametrize('direction', directions)
+def test_keeps_gap_to_leader(direction):
+    store = makeStore()
+    leader = addVehicle(store, direction, 20)
+    follower = addVehicle(store, direction, 80, leader=leader)
+    # only the leader can hold the follower back
+    store.stop[follower] = store.stop[leader]
+    sign = directionSigns[direction]
+    for tick in range(100):
+        store.move(*red(direction))
+    before = along(store, follower)
+    store.move(*red(direction))
+    assert along(store, follower)==before
+    assert sign*(rear(store, leader) - front(store, follower)) > gap2 - speed
+    assert store.waited[follower] > 0
+
+@pytest.mark.parametrize('direction', directions)
+def test_follower_moves_on_when_leader_drives_off(direction):
+    store = makeStore()
+    leader = addVehicle(store, direction, 20)
+    follower = addVehicle(store, direction, 80, leader=leader)
+    for tick in range(100):
+        store.move(direction, 0)
+    assert store.crossed[leader] and store.crossed[follower]
+
+@pytest.mark.parametrize('direction', directions)
+def test_turns_after_the_middle(direction):
+    store = makeStore()
+    slot = addVehicle(store, direction, 40, willTurn=True)
+    sign = directionSigns[direction]
+    rotations = 0
+    for tick in range(300):
+        crossed, rotated = store.move(direction, 0)
+        if slot in rotated:
+            assert sign*front(store, slot) >= sign*mids[direction]
+            rotations += 1
+        if store.turned[slot]:
+            break
+    assert store.turned[slot]
+    assert rotations==90//rotationAngle
+    assert store.angle[slot]==90
+    # once turned it drives along the other axis
+    x, y = store.x[slot], store.y[slot]
+    crossed, rotated = store.move(direction, 0)
+    assert len(rotated)==0
+    if direction%2==0:
+        assert store.x[slot]==x and store.y[slot]==y + turnedSigns[direction]*speed
+    else:
+        assert store.y[slot]==y and store.x[slot]==x + turnedSigns[direction]*speed
+
+def test_retire_frees_slots_off_the_canvas():
+    store = makeStore()
+    leader = addVehicle(store, 0, -400)
+    follower = addVehicle(store, 0, 40, leader=leader)
+    store.crossed[leader] = True
+    store.x[leader] = 1500
+    assert store.retire(1400, 800)==[None]
+    assert not store.alive[leader]
+    assert store.leader[follower]==-1
+    assert addVehicle(store, 1, 40)==leader     # the free slot is reused
+
+def test_snapshot_restore_pickles_identically():
+    store = makeStore()
+    for direction in directions:
+        addVehicle(store, direction, 40, willTurn=direction==1)
+    for tick in range(50):
+        store.move(1, 0)
+    state = store.snapshot()
+    copy = makeStore()
+    copy.restore(pickle.loads(pickle.dumps(state)), [None]*len(state['alive']))
+    assert pickle.dumps(copy.snapshot())==pickle.dumps(store.snapshot())
+    for tick in range(50):
+        store.move(2, 0)
+        copy.move(2, 0)
+    assert pickle.dumps(copy.snapshot())==pickle.dumps(store.snapshot())
+
+def test_groups_follow_their_own_phase():
+    store = makeStore()
+    first = addVehicle(store, 0, 40)
+    second = addVehicle(store, 0, 40)
+    store.group[second] = 1
+    for tick in range(60):
+        store.move(np.array([0, 1]), np.array([0, 0]))
+    assert store.crossed[first] and not store.crossed[second]
@@ -0,0 +1,9 @@
+from worker_pool import mapTasks
+
+
+def square(n):
+    return n*n
+
+
+def test_results_in_task_order():
+    assert mapTasks(square, list(range(10)), 2) == [n*n for n in range(10)]
@@ -1,27 +1,167 @@
 # vehicle_detection.py
-import torch
-import cv2
-
-# Load YOLOv5 model
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
-
-# Define the vehicle classes YOLO detects
-vehicle_labels = ['car', 'truck', 'bus', 'motorcycle', 'bicycle']
-
-def detect_vehicles(frame):
-    results = model(frame)
-    detections = results.pandas().xyxy[0]
-
-    counts = {'car': 0, 'truck': 0, 'bus': 0, 'bike': 0, 'rickshaw': 0}
-    for _, row in detections.iterrows():
-        label = row['name']
-        if label == 'car':
-            counts['car'] += 1
-        elif label == 'truck':
-            counts['truck'] += 1
-        elif label == 'bus':
-            counts['bus'] += 1
-        elif label in ['motorcycle', 'bicycle']:
-            counts['bike'] += 1
+# YOLOv5 vehicle counts of camera frames. The model is loaded on first use, or ahead of
+# it with warmUp(), so importing this module does not import torch. The yolov5 code
+# and weights are kept in cacheDir: the first load fetches them, later ones (and
+# machines they were copied to) start without network.
+#   python vehicle_detection.py                 fill the cache, e.g. before going offline
+#   python vehicle_detection.py --video clip.mp4   counts of every frame of a recording
+import argparse
+import os
+import threading
+import numpy as np
 
+# Local copy of the model, YOLO_CACHE overrides where it is kept
+cacheDir = os.environ.get('YOLO_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+repoDir = os.path.join(cacheDir, 'ultralytics_yolov5_master')   # where torch.hub unpacks the yolov5 code
+weightsPath = os.path.join(cacheDir, 'yolov5s.pt')
+inputSize = 640     # pixels of the longer side frames are scaled to for the model
+maxBatch = 8        # frames per forward pass of detect_vehicles_batch()
+
+model = None
+modelLock = threading.Lock()
+
+# Count each vehicle class YOLO detects goes to, by COCO class id
+countNames = ['car', 'truck', 'bus', 'bike', 'rickshaw']
+classBuckets = {2: 'car', 7: 'truck', 5: 'bus', 3: 'bike', 1: 'bike'}   # car, truck, bus, motorcycle, bicycle
+# Position in countNames of every class id, the other classes go to one past the end
+bucketOf = np.full(80, len(countNames))
+for classId, name in classBuckets.items():
+    bucketOf[classId] = countNames.index(name)
+
+confidence = 0.25   # detections less confident than this are not counted
+iou = 0.45          # overlap above which non-maximum suppression keeps only the best box
+perClassNms = True  # suppress boxes only within a class, so a bus box does not hide a truck
+
+# Frame-change gate: a frame of a source that barely differs from the last one YOLO ran
+# on for that source reuses its counts. Frames are compared as small grey thumbnails.
+changeThreshold = 2.0   # mean absolute difference of the thumbnails, out of 255, below which counts are reused; 0 turns the gate off
+gateSize = (64, 36)     # width and height of the thumbnails
+maxReuse = 50           # frames in a row that may reuse the counts before YOLO runs anyway
+
+def loadModel():
+    global model
+    with modelLock:
+        if model is None:
+            import torch
+            torch.hub.set_dir(cacheDir)
+            if os.path.isdir(repoDir) and os.path.exists(weightsPath):
+                model = torch.hub.load(repoDir, 'custom', path=weightsPath, source='local')
+            else:
+                # downloads the code into repoDir and the weights to weightsPath
+                model = torch.hub.load('ultralytics/yolov5', 'custom', path=weightsPath)
+    return model
+
+# Load the model and run it once, so the first real frame does not pay for it
+def warmUp():
+    loadModel()(np.zeros((inputSize, inputSize, 3), dtype=np.uint8), size=inputSize)
+
+# Thumbnail the frame gate compares
+def frameSignature(frame):
+    import cv2
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim==3 else frame
+    return cv2.resize(grey, gateSize, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+class FrameGate:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last = {}      # source -> [signature, counts, reuses] of the last frame YOLO ran on
+        self.hits = 0
+        self.misses = 0
+
+    # (counts, signature), counts is None when the frame has to go through YOLO
+    def lookup(self, source, frame):
+        signature = frameSignature(frame)
+        with self.lock:
+            last = self.last.get(source)
+            if last is not None and last[2]<maxReuse and np.abs(signature - last[0]).mean()<changeThreshold:
+                last[2] += 1
+                self.hits += 1
+                return dict(last[1]), signature
+            self.misses += 1
+        return None, signature
+
+    def store(self, source, signature, counts):
+        with self.lock:
+            self.last[source] = [signature, dict(counts), 0]
+
+    # Share of the frames that reused counts
+    def hitRate(self):
+        total = self.hits + self.misses
+        return self.hits/float(total) if total else 0.0
+
+frameGate = FrameGate()
+
+# source names the camera the frame comes from, frames of a source are gated against each other
+def detect_vehicles(frame, size=None, source=None):
+    return detect_vehicles_batch([frame], size=size, sources=None if source is None else [source])[0]
+
+# Counts of every frame in frames, e.g. one per approach, with one forward pass per batchSize
+# frames. With sources, the source of every frame, unchanged frames skip YOLO.
+def detect_vehicles_batch(frames, batchSize=None, size=None, sources=None):
+    batchSize = batchSize or maxBatch
+    size = size or inputSize
+    counts = [None]*len(frames)
+    signatures = [None]*len(frames)
+    if sources is not None and changeThreshold>0:
+        for i in range(len(frames)):
+            counts[i], signatures[i] = frameGate.lookup(sources[i], frames[i])
+    changed = [i for i in range(len(frames)) if counts[i] is None]
+    if not changed:
+        return counts
+    model = loadModel()
+    # the NMS settings of the model, only vehicle classes are kept
+    model.conf = confidence
+    model.iou = iou
+    model.agnostic = not perClassNms
+    model.classes = sorted(classBuckets)
+    for start in range(0, len(changed), batchSize):
+        batch = changed[start:start+batchSize]
+        results = model([frames[i] for i in batch], size=size)
+        for i, detections in zip(batch, results.xyxy):
+            counts[i] = countDetections(detections)
+            if signatures[i] is not None:
+                frameGate.store(sources[i], signatures[i], counts[i])
+    return counts
+
+# Counts of the rows (x1, y1, x2, y2, confidence, class) of one frame's detections
+def countDetections(detections):
+    if hasattr(detections, 'cpu'):
+        detections = detections.cpu().numpy()
+    classes = detections[detections[:, 4]>=confidence, 5].astype(int)
+    buckets = np.bincount(bucketOf[classes], minlength=len(countNames)+1)
+    return dict(zip(countNames, buckets[:len(countNames)].tolist()))
+
+# Counts of every frame of a video file, read and detected batchSize frames at a time
+def countVideo(path, batchSize=None, size=None):
+    import cv2
+    video = cv2.VideoCapture(path)
+    counts = []
+    frames = []
+    while True:
+        ret, frame = video.read()
+        if ret:
+            frames.append(frame)
+        if frames and (not ret or len(frames)==(batchSize or maxBatch)):
+            counts.extend(detect_vehicles_batch(frames, batchSize, size, [path]*len(frames)))
+            frames = []
+        if not ret:
+            break
+    video.release()
     return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='YOLOv5 vehicle counts')
+    parser.add_argument('--video', default=None, help='print the counts of every frame of this recording')
+    parser.add_argument('--batch', type=int, default=maxBatch, help='frames per forward pass')
+    parser.add_argument('--size', type=int, default=inputSize, help='input resolution of the model')
+    parser.add_argument('--threshold', type=float, default=changeThreshold, help='frame change below which counts are reused, 0 runs YOLO on every frame')
+    args = parser.parse_args()
+
+    changeThreshold = args.threshold
+
+    warmUp()
+    print('YOLOv5 ready in', cacheDir)
+    if args.video:
+        for number, counts in enumerate(countVideo(args.video, args.batch, args.size)):
+            print(number, counts)
+        print('Frames reused: ', frameGate.hits, ' of ', frameGate.hits+frameGate.misses, ' hit rate: ', round(frameGate.hitRate(), 3))
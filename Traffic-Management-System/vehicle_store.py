@@ -0,0 +1,386 @@
+# Structure-of-arrays vehicle state for the simulation
+# Every vehicle owns one slot in a set of NumPy arrays and the whole
+# population is moved with a handful of batched array operations per tick.
+# Direction numbers follow directionNumbers in simulation.py: 0 right, 1 down, 2 left, 3 up
+# Vehicles of several junctions with the same geometry can share a store, each junction
+# being one group with its own signal phase.
+import numpy as np
+try:
+    import numba
+except ImportError:     # move() and retire() then run as NumPy operations on whole arrays
+    numba = None
+
+# +1 when the vehicle drives towards growing coordinates (right, down), -1 otherwise
+directionSigns = np.array([1, 1, -1, -1])
+# Offset applied on every frame of a turn
+turnSteps = np.array([[2, 1.8], [-2.5, 2], [-1.8, -2.5], [1, -1]])
+# Sign of the movement once the turn is complete: right turns down, down turns left, ...
+turnedSigns = np.array([1, -1, -1, 1])
+# Frames in a row a vehicle has to stand to count as a stop, shorter halts are a follower
+# keeping its gap to a slower leader
+stopFrames = 15
+
+# One pass over the slots doing what move() does with NumPy, for numba to compile: the
+# fixed cost of some 50 NumPy calls per tick is most of a headless run, the work on a few
+# hundred vehicles is not. All decisions are taken on the positions before the move, then
+# every vehicle moves. Returns the slots that crossed and the ones that rotated, in order.
+def moveSlots(n, alive, d, x, y, width, height, speed, stop, leader, angle, crossed, willTurn, turned,
+              group, horizontal, sign, signedStopLine, signedMid, waited, stops, standing,
+              greens, yellows, grouped, gap2, rotationAngle, turnSteps, turnedSigns, stopFrames):
+    # 0 stays, 1 moves along its axis, 2 moves on after its turn, 3 rotates
+    action = np.zeros(n, dtype=np.int8)
+    newlyCrossed = np.empty(n, dtype=np.int64)
+    crossedCount = 0
+    for i in range(n):
+        if not alive[i]:
+            standing[i] = 0
+            continue
+        pos = x[i] if horizontal[i] else y[i]
+        front = pos + (width[i] if horizontal[i] else height[i]) if sign[i]>0 else pos
+        front *= sign[i]
+        if not crossed[i] and front>signedStopLine[i]:
+            crossed[i] = True
+            newlyCrossed[crossedCount] = i
+            crossedCount += 1
+        straight = not willTurn[i] or not crossed[i] or front<signedMid[i]
+        l = leader[i]
+        if straight:
+            gapOk = True
+            if l>=0 and not turned[l]:
+                leaderRear = x[l] if horizontal[l] else y[l]
+                if sign[i]<0:
+                    leaderRear += width[l] if horizontal[l] else height[l]
+                gapOk = front < sign[i]*leaderRear - gap2
+            g = group[i] if grouped else 0
+            canGo = front<=sign[i]*stop[i] or crossed[i] or (d[i]==greens[g] and yellows[g]==0)
+            if canGo and gapOk:
+                action[i] = 1
+        elif not turned[i]:
+            action[i] = 3
+        else:
+            afterOk = True
+            if l>=0:
+                ax, ay, aw, ah = x[i], y[i], width[i], height[i]
+                bx, by, bw, bh = x[l], y[l], width[l], height[l]
+                if d[i]==0:
+                    afterOk = ay+ah < by-gap2 or ax+aw < bx-gap2
+                elif d[i]==1:
+                    afterOk = ax > bx+bw+gap2 or ay < by-gap2
+                elif d[i]==2:
+                    afterOk = ay > by+bh+gap2 or ax > bx+gap2
+                else:
+                    afterOk = ax < bx-bw-gap2 or ay > by+gap2
+            if afterOk:
+                action[i] = 2
+        if not crossed[i] and action[i]!=1:
+            standing[i] += 1
+            waited[i] += 1
+            if standing[i]==stopFrames:
+                stops[i] += 1
+        else:
+            standing[i] = 0
+
+    rotated = np.empty(n, dtype=np.int64)
+    rotatedCount = 0
+    for i in range(n):
+        if action[i]==1:
+            if horizontal[i]:
+                x[i] += sign[i]*speed[i]
+            else:
+                y[i] += sign[i]*speed[i]
+        elif action[i]==2:
+            if horizontal[i]:
+                y[i] += turnedSigns[d[i]]*speed[i]
+            else:
+                x[i] += turnedSigns[d[i]]*speed[i]
+        elif action[i]==3:
+            angle[i] += rotationAngle
+            x[i] += turnSteps[d[i], 0]
+            y[i] += turnSteps[d[i], 1]
+            turned[i] = angle[i]>=90
+            rotated[rotatedCount] = i
+            rotatedCount += 1
+    return newlyCrossed[:crossedCount], rotated[:rotatedCount]
+
+# Slots of retire() that leave, their followers losing the leader
+def retireSlots(n, alive, crossed, x, y, width, height, leader, canvasWidth, canvasHeight):
+    leaving = np.zeros(n, dtype=np.bool_)
+    gone = np.empty(n, dtype=np.int64)
+    count = 0
+    for i in range(n):
+        if alive[i] and crossed[i] and (x[i] > canvasWidth or x[i]+width[i] < 0 or y[i] > canvasHeight or y[i]+height[i] < 0):
+            alive[i] = False
+            leaving[i] = True
+            gone[count] = i
+            count += 1
+    if count:
+        for i in range(n):
+            if leader[i]>=0 and leaving[leader[i]]:
+                leader[i] = -1
+    return gone[:count]
+
+if numba is not None:
+    moveSlots = numba.njit(cache=True)(moveSlots)
+    retireSlots = numba.njit(cache=True)(retireSlots)
+
+# Per-vehicle arrays and the value of an empty slot
+fields = {
+    'x': (float, 0), 'y': (float, 0), 'width': (float, 0), 'height': (float, 0),
+    'speed': (float, 0), 'stop': (float, 0),
+    'direction': (np.int8, 0), 'lane': (np.int8, 0), 'leader': (np.int32, -1), 'angle': (np.int16, 0),
+    'crossed': (bool, False), 'willTurn': (bool, False), 'turned': (bool, False), 'alive': (bool, False),
+    'group': (np.int16, 0),
+    # constants of the direction, copied to the slot so move() needs no lookups by direction:
+    # travel along x, +1 or -1 as in directionSigns, and the stop line and the middle of
+    # the junction along the axis of travel times that sign
+    'horizontal': (bool, False), 'sign': (float, 0), 'signedStopLine': (float, 0), 'signedMid': (float, 0),
+    # for the metrics: spawn time, frames spent standing before the stop line, stops there
+    # and the frames the vehicle has been standing for now
+    'spawned': (float, 0), 'waited': (np.int32, 0), 'stops': (np.int16, 0), 'standing': (np.int32, 0),
+}
+
+# Position and state of a vehicle object, read from the slot it owns in self.store
+class StoredVehicle:
+    @property
+    def x(self):
+        return self.store.x[self.slot]
+
+    @property
+    def y(self):
+        return self.store.y[self.slot]
+
+    @property
+    def width(self):
+        return self.store.width[self.slot]
+
+    @property
+    def height(self):
+        return self.store.height[self.slot]
+
+    @property
+    def stop(self):
+        return self.store.stop[self.slot]
+
+    @property
+    def crossed(self):
+        return int(self.store.crossed[self.slot])
+
+    @property
+    def turned(self):
+        return int(self.store.turned[self.slot])
+
+    @property
+    def rotateAngle(self):
+        return int(self.store.angle[self.slot])
+
+class VehicleStore:
+    compiled = numba is not None    # move with moveSlots() and retireSlots(), False for NumPy
+
+    def __init__(self, stopLines, mids, gap2, rotationAngle, capacity=256):
+        # stopLines and mids are indexed by direction number, mids along the axis of travel
+        self.stopLines = np.asarray(stopLines, dtype=float)
+        self.mids = np.asarray(mids, dtype=float)
+        self.gap2 = gap2
+        self.rotationAngle = rotationAngle
+        self.size = 0       # slots handed out so far
+        self.free = []      # slots of retired vehicles, reused before growing
+        self.capacity = 0
+        self.owners = []    # sprite owning each slot
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        for name, (dtype, fill) in fields.items():
+            array = np.full(capacity, fill, dtype=dtype)
+            if(self.capacity):
+                array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.owners.extend([None]*(capacity-self.capacity))
+        self.capacity = capacity
+
+    # Register a vehicle and return its slot, leader is the slot of the vehicle ahead in the lane or -1
+    def add(self, owner, directionNumber, lane, x, y, width, height, speed, stop, willTurn, leader, group=0, spawned=0):
+        if(self.free):
+            slot = self.free.pop()
+        else:
+            if(self.size==self.capacity):
+                self.allocate(self.capacity*2)
+            slot = self.size
+            self.size += 1
+        self.x[slot] = x
+        self.y[slot] = y
+        self.width[slot] = width
+        self.height[slot] = height
+        self.speed[slot] = speed
+        self.stop[slot] = stop
+        self.direction[slot] = directionNumber
+        self.horizontal[slot] = directionNumber%2==0
+        self.sign[slot] = directionSigns[directionNumber]
+        self.signedStopLine[slot] = directionSigns[directionNumber]*self.stopLines[directionNumber]
+        self.signedMid[slot] = directionSigns[directionNumber]*self.mids[directionNumber]
+        self.lane[slot] = lane
+        self.leader[slot] = leader
+        self.angle[slot] = 0
+        self.crossed[slot] = False
+        self.willTurn[slot] = bool(willTurn)
+        self.turned[slot] = False
+        self.group[slot] = group
+        self.spawned[slot] = spawned
+        self.waited[slot] = 0
+        self.stops[slot] = 0
+        self.standing[slot] = 0
+        self.owners[slot] = owner
+        self.alive[slot] = True
+        return slot
+
+    # Free the slots of the vehicles that have crossed and left the width x height canvas.
+    # Their followers lose the leader, which is out of sight anyway. Returns the retired owners.
+    def retire(self, width, height):
+        n = self.size
+        if(self.compiled):
+            gone = retireSlots(n, self.alive, self.crossed, self.x, self.y, self.width, self.height, self.leader, width, height)
+        else:
+            gone = self.leaving(width, height)
+        if(len(gone)==0):
+            return []
+        owners = [self.owners[slot] for slot in gone]
+        for slot in gone:
+            self.owners[slot] = None
+        self.free.extend(gone.tolist())
+        return owners
+
+    def leaving(self, width, height):
+        n = self.size
+        x = self.x[:n]
+        y = self.y[:n]
+        gone = np.flatnonzero(self.alive[:n] & self.crossed[:n] & (
+            (x > width) | (x+self.width[:n] < 0) | (y > height) | (y+self.height[:n] < 0)))
+        if(len(gone)):
+            self.alive[gone] = False
+            leader = self.leader[:n]
+            leader[np.isin(leader, gone)] = -1
+        return gone
+
+    # Copy of the used part of every array and of the free list
+    def snapshot(self):
+        state = {name: getattr(self, name)[:self.size].copy() for name in fields}
+        state['free'] = list(self.free)
+        return state
+
+    # Replace the whole store with a snapshot(), owners lists the sprite of every slot (None when free)
+    def restore(self, state, owners):
+        size = len(state['alive'])
+        self.capacity = 0
+        self.owners = []
+        self.allocate(max(size, 256))
+        for name in fields:
+            getattr(self, name)[:size] = state[name]
+        self.size = size
+        self.free = list(state['free'])
+        self.owners[:size] = owners
+
+    # Move every stop coordinate of a direction back to its default, as when its signal turns yellow
+    def resetStops(self, directionNumber, stop, group=None):
+        n = self.size
+        reset = self.direction[:n]==directionNumber
+        if group is not None:
+            reset &= self.group[:n]==group
+        self.stop[:n][reset] = stop
+
+    # Advance all vehicles by one frame. currentGreen and currentYellow are numbers, or
+    # arrays with the phase of every group when the store holds several junctions.
+    # Returns the slots of the vehicles that crossed the stop line on this frame
+    # and the slots whose rotation angle changed, so their images can be updated.
+    def move(self, currentGreen, currentYellow):
+        if(self.compiled):
+            grouped = bool(np.ndim(currentGreen))
+            if not grouped:
+                currentGreen, currentYellow = np.array([currentGreen]), np.array([currentYellow])
+            return moveSlots(self.size, self.alive, self.direction, self.x, self.y, self.width, self.height,
+                             self.speed, self.stop, self.leader, self.angle, self.crossed, self.willTurn,
+                             self.turned, self.group, self.horizontal, self.sign, self.signedStopLine,
+                             self.signedMid, self.waited, self.stops, self.standing, currentGreen,
+                             currentYellow, grouped, self.gap2, self.rotationAngle, turnSteps, turnedSigns,
+                             stopFrames)
+        n = self.size
+        alive = self.alive[:n]
+        d = self.direction[:n]
+        x = self.x[:n]
+        y = self.y[:n]
+        width = self.width[:n]
+        height = self.height[:n]
+        crossed = self.crossed[:n]
+        turned = self.turned[:n]
+        sign = self.sign[:n]
+        horizontal = self.horizontal[:n]
+        gap2 = self.gap2
+
+        forward = sign>0
+        pos = np.where(horizontal, x, y)
+        size = np.where(horizontal, width, height)
+        # edge facing the direction of travel, times sign so that further on is always greater
+        front = sign*(pos + np.where(forward, size, 0))
+
+        # stop line crossing, counted once per vehicle
+        newlyCrossed = alive & ~crossed & (front > self.signedStopLine[:n])
+        crossed |= newlyCrossed
+
+        # leader of each vehicle, only meaningful where hasLeader. A leader drives the same
+        # direction, so its position and size are along the same axis.
+        leader = self.leader[:n]
+        hasLeader = leader>=0
+        lead = np.where(hasLeader, leader, 0)
+        leaderTurned = hasLeader & turned[lead]
+        leaderRear = pos[lead] + np.where(forward, 0, size[lead])
+        gapOk = ~hasLeader | (front < sign*leaderRear - gap2) | leaderTurned
+
+        if(np.ndim(currentGreen)):
+            group = self.group[:n]
+            currentGreen = currentGreen[group]
+            currentYellow = currentYellow[group]
+        green = (d==currentGreen) & (currentYellow==0)
+        canGo = (front <= sign*self.stop[:n]) | crossed | green
+
+        straight = ~self.willTurn[:n] | ~crossed | (front < self.signedMid[:n])
+        advance = alive & straight & canGo & gapOk
+        turning = alive & ~straight & ~turned
+
+        # vehicles past their turn keep a gap to the leader on both axes, as the sprites did
+        after = np.flatnonzero(alive & ~straight & turned)
+        if(len(after)):
+            ad = d[after]
+            al = lead[after]
+            ax, ay, aw, ah = x[after], y[after], width[after], height[after]
+            bx, by, bw, bh = x[al], y[al], width[al], height[al]
+            afterOk = ~hasLeader[after] | np.choose(ad,
+                [(ay+ah < by-gap2) | (ax+aw < bx-gap2),
+                 (ax > bx+bw+gap2) | (ay < by-gap2),
+                 (ay > by+bh+gap2) | (ax > bx+gap2),
+                 (ax < bx-bw-gap2) | (ay > by+gap2)])
+            after = after[afterOk]
+
+        step = np.where(advance, sign*self.speed[:n], 0)
+        x += np.where(horizontal, step, 0)
+        y += np.where(horizontal, 0, step)
+
+        halted = alive & ~crossed & ~advance
+        standing = self.standing[:n]
+        standing += halted
+        standing[~halted] = 0
+        self.waited[:n] += halted
+        self.stops[:n] += standing==stopFrames
+
+        if(len(after)):
+            turnedStep = turnedSigns[d[after]]*self.speed[after]
+            alongX = ~horizontal[after]
+            x[after[alongX]] += turnedStep[alongX]
+            y[after[~alongX]] += turnedStep[~alongX]
+
+        rotated = np.flatnonzero(turning)
+        if(len(rotated)):
+            rd = d[rotated]
+            self.angle[rotated] += self.rotationAngle
+            x[rotated] += turnSteps[rd, 0]
+            y[rotated] += turnSteps[rd, 1]
+            turned[rotated] = self.angle[rotated]>=90
+
+        return np.flatnonzero(newlyCrossed), rotated
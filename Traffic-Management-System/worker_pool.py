@@ -0,0 +1,14 @@
+# Process pool of the batch scripts (montecarlo, calibrate, benchmark)
+# The workers are reused across tasks: each imports simulation once and every
+# runHeadless() starts from an empty junction, so a task only sets what it varies.
+from multiprocessing import Pool
+import os
+
+# Results of function over tasks in order, one task handed out at a time
+def mapTasks(function, tasks, processes=None):
+    with Pool(processes=processes or os.cpu_count()) as pool:
+        results = pool.map(function, tasks, chunksize=1)
+        # workers exit on their own: pygame turns the SIGTERM of terminate() into a quit event
+        pool.close()
+        pool.join()
+    return results